@@ -0,0 +1,120 @@
+"""
+Query API for the filtered data, on the same filter engine and result cache as the dashboard.
+
+    GET /api/aggregates   count, salary percentiles, per-group statistics and trendline
+                          coefficients (slope, intercept) per `color_by` value
+    GET /api/rows         the filtered rows as CSV (default) or NDJSON (`format=ndjson`)
+
+Both take the filter state of the dashboard as query parameters, each checklist as a repeated
+parameter; a checklist that is left out means everything selected, as in the default view:
+
+    job=Sjukhusfysiker&job=Chef&department=...&specialist=Specialist&exp_min=5&exp_max=20
+
+Filter states are canonicalized with `filter_state_key`, so API and dashboard requests for the
+same selection share cached row selections and aggregates. Rows are streamed in chunks from a
+generator and never materialized as one response body.
+"""
+import json
+import math
+
+from flask import Response, abort, jsonify, request
+
+from cache_config import filter_state_key, result_cache
+from callbacks import default_selection, get_filtered_data
+from dataset import CATEGORY_COLUMNS, INT_COLUMNS
+from layout import COLOR_BY_OPTIONS, DEFAULT_EXP_RANGE
+
+ROW_CHUNK_SIZE = 10_000
+EXPORT_COLUMNS = list(CATEGORY_COLUMNS + INT_COLUMNS)
+ROW_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _finite(value):
+    """JSON-safe number: NaN (statistics of an empty selection) becomes None."""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+@result_cache.memoize
+def query_aggregates(data, state, color_by):
+    """
+    Aggregates of the rows matching a filter state, as returned by `/api/aggregates`.
+
+    Returns:
+        dict: "version", "count", "statistics" (as in the statistics tab), "groups" (per
+        `color_by` value) and "trendlines" ("overall" and "by_group" fits, see
+        `TrendlineModel.coefficients`).
+    """
+    by_group, overall = data.trend_model.coefficients(state, color_by)
+    return {
+        "version": data.version,
+        "count": len(get_filtered_data(data.engine, state)),
+        "statistics": {key: _finite(value) for key, value in data.salary_stats.filtered(state).items()},
+        "color_by": color_by,
+        "groups": data.salary_stats.by_group(state, color_by),
+        "trendlines": {"overall": overall, "by_group": by_group},
+    }
+
+
+def iter_rows(df, rows, output_format, chunk_size=ROW_CHUNK_SIZE):
+    """
+    Yield the given rows of a dataframe as CSV (with a header) or NDJSON text, chunk by chunk.
+
+    Args:
+        df (pd.DataFrame): Prepared dataframe.
+        rows (np.ndarray): Row positions to export (from `FilterEngine.select`).
+        output_format (str): "csv" or "ndjson".
+    """
+    if output_format == "csv":
+        yield df.iloc[:0][EXPORT_COLUMNS].to_csv(index=False)
+    for start in range(0, len(rows), chunk_size):
+        chunk = df.iloc[rows[start:start + chunk_size]][EXPORT_COLUMNS]
+        if output_format == "csv":
+            yield chunk.to_csv(index=False, header=False)
+        else:
+            yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk.to_dict("records"))
+
+
+def _request_state(data):
+    """Canonical filter state from the query parameters (400 for an invalid experience range)."""
+    selected_jobs, selected_depts, selected_specialists = default_selection(data)
+    args = request.args
+    try:
+        exp_range = [int(args.get("exp_min", DEFAULT_EXP_RANGE[0])), int(args.get("exp_max", DEFAULT_EXP_RANGE[1]))]
+    except ValueError:
+        abort(400, description="exp_min and exp_max must be whole numbers of years")
+    return filter_state_key(
+        args.getlist("job") if "job" in args else selected_jobs,
+        args.getlist("department") if "department" in args else selected_depts,
+        args.getlist("specialist") if "specialist" in args else selected_specialists,
+        exp_range,
+    )
+
+
+def init_api(app, dataset_manager):
+    """Register the `/api` routes on the Flask server behind `app`."""
+    server = app.server
+
+    @server.route("/api/aggregates")
+    def api_aggregates():
+        data = dataset_manager.current
+        color_by = request.args.get("color_by", "Job Title")
+        if color_by not in COLOR_BY_OPTIONS:
+            abort(400, description=f"color_by must be one of {', '.join(COLOR_BY_OPTIONS)}")
+        state = _request_state(data)
+        return jsonify(dict(query_aggregates(data, state, color_by), filter=state))
+
+    @server.route("/api/rows")
+    def api_rows():
+        data = dataset_manager.current
+        output_format = request.args.get("format", "csv")
+        if output_format not in ROW_FORMATS:
+            abort(400, description=f"format must be one of {', '.join(ROW_FORMATS)}")
+        rows = get_filtered_data(data.engine, _request_state(data))
+        return Response(
+            iter_rows(data.df, rows, output_format),
+            mimetype=ROW_FORMATS[output_format],
+            headers={
+                "Content-Disposition": f'attachment; filename="salary_data_{data.version}.{output_format}"',
+                "X-Dataset-Version": data.version,
+            },
+        )
@@ -1,88 +1,161 @@
+import sys
+from startup_profile import profiler
+
+# `python app.py --profile-startup` times every import and init step below, then exits
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    profiler.install()
+
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
+import hmac
 import os
-from layout import layout
-from callbacks import register_callbacks, update_filter_options
+import threading
+import uuid
+from flask import abort, has_request_context, jsonify, request
+from layout import CHECKLIST_INPUT_STYLE, build_layout
+from callbacks import register_callbacks, prerender_initial_view
 from dash import dcc, html
-from cache_config import cache, init_cache
-
+from cache_config import init_cache, shared_cache_config, result_cache
+from metrics import init_metrics, logger
+from compression import init_compression
+from dataset import DatasetManager
+from cache_warmer import CacheWarmer
+from speculative import SpeculativeRenderer
+from api import init_api
+
+
+IS_AZURE = "WEBSITE_HOSTNAME" in os.environ
+# Result cache shared by all workers (see gunicorn.conf.py): Redis if CACHE_REDIS_URL is set, else
+# a cache directory on Azure (several workers per instance), else one in-process cache
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "redis" if CACHE_REDIS_URL else "filesystem" if IS_AZURE else "simple")
+CACHE_DIR = os.environ.get("CACHE_DIR", "/tmp/salary-dashboard-cache")
+# Directory where the workers share their metrics, so /metrics reports all of them (gunicorn.conf.py sets it)
+METRICS_DIR = os.environ.get("METRICS_DIR")
+# Seconds between checks for a new dataset (0 disables), and the token for POST /admin/reload
+DATASET_WATCH_INTERVAL = float(os.environ.get("DATASET_WATCH_INTERVAL", "30"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# Budget of the background cache warm-up after startup and dataset reloads (0 s disables it)
+CACHE_WARM_TIME_BUDGET_S = float(os.environ.get("CACHE_WARM_TIME_BUDGET_S", "30"))
+CACHE_WARM_MEMORY_BUDGET_MB = float(os.environ.get("CACHE_WARM_MEMORY_BUDGET_MB", "16"))
+# gzip/brotli compression of responses (set to 0 if a proxy in front already compresses)
+COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "1") != "0"
+# Threads that render inactive tabs ahead of a tab switch (0 disables), and their queue limit
+SPECULATIVE_WORKERS = int(os.environ.get("SPECULATIVE_WORKERS", "1"))
+SPECULATIVE_MAX_PENDING = int(os.environ.get("SPECULATIVE_MAX_PENDING", "8"))
 
 # Initialize Dash app
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+with profiler.step("dash.Dash"):
+    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server  # Needed for deployment
-init_cache(app)
-
-# Load data
-local_path = "salary_data.csv"
-
-if os.path.exists(local_path):
-    df = pd.read_csv(local_path)
-else:
-    print("❌ ERROR: CSV file not found in either location.")
-    df = None  # Handle the case where the dataframe is empty
-
-# Rename columns to English-friendly names
-df.rename(columns={
-    "Befattning": "Job Title",
-    "Arbetsplats": "Department",
-    "Antal hela \u00e5r med arbete i klinisk verksamhet": "ExperienceYears",
-    "M\u00e5nadsl\u00f6n totalt": "Månadslön totalt"
-}, inplace=True)
-
-# Fill NaN values with "Not Specified"
-df["Job Title"] = df["Job Title"].fillna("Not Specified")
-df["Department"] = df["Department"].fillna("Not Specified")
-df["Specialist eller ST-fysiker"] = df["Specialist eller ST-fysiker"].fillna("Nej")
-
-# Get all unique values before Dash initializes
-all_jobs = sorted(df["Job Title"].unique().tolist())
-all_depts = sorted(df["Department"].unique().tolist())
-all_specialists = ["Specialist", "ST-fysiker", "Nej"]
-
-# Inject these predefined checklists into `layout`
-layout["job-title-filter"] = dcc.Checklist(
-    id="job-title-filter",
-    options=[{"label": job, "value": job} for job in all_jobs],
-    value=all_jobs,  # Default: All selected
-    style={"display": "flex", "flexDirection": "column"}
-)
-
-layout["department-filter"] = dcc.Checklist(
-    id="department-filter",
-    options=[{"label": dept, "value": dept} for dept in all_depts],
-    value=all_depts,  # Default: All selected
-    style={"display": "flex", "flexDirection": "column"}
-)
-
-layout["specialist-filter"] = dcc.Checklist(
-    id="specialist-filter",
-    options=[{"label": spec, "value": spec} for spec in all_specialists],
-    value=all_specialists,  # Default: All selected
-    style={"display": "flex", "flexDirection": "column"}
-)
-
-# Inject checklists into layout dynamically
-layout["reset-filters"] = html.Button("Reset Filters", id="reset-filters", n_clicks=0)
-layout["job-title-filter"] = dcc.Checklist(id="job-title-filter", options=[], value=[])
-layout["department-filter"] = dcc.Checklist(id="department-filter", options=[], value=[])
-layout["specialist-filter"] = dcc.Checklist(id="specialist-filter", options=[], value=[])
-# layout["job-title-filter"] = dcc.Checklist(id="job-title-filter", options=initial_options[0], value=initial_options[1])
-# layout["department-filter"] = dcc.Checklist(id="department-filter", options=initial_options[2], value=initial_options[3])
-# layout["specialist-filter"] = dcc.Checklist(id="specialist-filter", options=initial_options[4], value=initial_options[5])
-
-
-# Assign layout to app
-app.layout = layout
-
-# Register callbacks (pass the app and df)
-register_callbacks(app, df)
+with profiler.step("init_cache / init_metrics"):
+    init_cache(app, shared_cache_config(CACHE_BACKEND, redis_url=CACHE_REDIS_URL, cache_dir=CACHE_DIR))
+    init_metrics(app, METRICS_DIR)  # /metrics route and response-size tracking
+    if COMPRESS_RESPONSES:
+        init_compression(app)
+
+# Load data (memory-mapped snapshot if one was built with `python dataset.py`, else the CSV) and
+# build its indexes. Under gunicorn with preload_app this runs once in the master and workers
+# share it after fork. Results of a replaced dataset version are dropped from the cache.
+with profiler.step("load_dataset + indexes"):
+    dataset_manager = DatasetManager(on_swap=lambda old, new: on_dataset_swap(old, new))
+
+
+def serve_layout():
+    """
+    Layout with the default view of the current dataset prerendered: checklists, filter state
+    and the default tab's figure are filled in, so the first paint needs no callback round trip.
+    """
+    if has_request_context():
+        view = prerender_initial_view(dataset_manager.current)
+    else:
+        # Dash calls this once when the layout is assigned, only to collect the component ids;
+        # prerendering there would build the figure (and load plotly) at import
+        view = {"options": ([], [], []), "selection": ([], [], [])}
+    job_options, dept_options, specialist_options = view["options"]
+    selected_jobs, selected_depts, selected_specialists = view["selection"]
+
+    layout = build_layout()
+    # Inject checklists into layout dynamically
+    layout["reset-filters"] = html.Button("Reset Filters", id="reset-filters", n_clicks=0)
+    layout["job-title-filter"] = dcc.Checklist(id="job-title-filter", options=job_options, value=selected_jobs, inputStyle=CHECKLIST_INPUT_STYLE)
+    layout["department-filter"] = dcc.Checklist(id="department-filter", options=dept_options, value=selected_depts, inputStyle=CHECKLIST_INPUT_STYLE)
+    layout["specialist-filter"] = dcc.Checklist(id="specialist-filter", options=specialist_options, value=selected_specialists, inputStyle=CHECKLIST_INPUT_STYLE)
+    if "figure" in view:
+        layout["filter-state"].data = view["filter_state"]
+        layout["tab-graph"].figure = view["figure"]
+        layout["graph-render-key"].data = view["render_key"]
+    layout["session-id"].data = uuid.uuid4().hex
+    return layout
+
+
+def on_dataset_swap(old, new):
+    # Results of the old version are never asked for again; prerender the new default view
+    result_cache.evict_version(old.version)
+    prerender_initial_view(new)
+    cache_warmer.start(new)
+
+
+cache_warmer = CacheWarmer(CACHE_WARM_TIME_BUDGET_S, int(CACHE_WARM_MEMORY_BUDGET_MB * 1024 * 1024))
+
+
+def prerender_in_background(data):
+    """
+    Prerender the default view of `data` in a background thread. Not done at import: building
+    the figure loads plotly, which would put it back on the startup path (see `render_graph`).
+    """
+    def prerender():
+        try:
+            prerender_initial_view(data)
+        except Exception:
+            logger.exception("Prerendering the initial view failed for %r", data)
+
+    thread = threading.Thread(target=prerender, name="prerender", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_background_tasks():
+    """Threads that run next to the server; under gunicorn they are started in each worker."""
+    prerender_in_background(dataset_manager.current)
+    dataset_manager.start_watching(DATASET_WATCH_INTERVAL)
+    cache_warmer.start(dataset_manager.current)
+
+
+# Assign layout to app (a function: it is called for every page load)
+app.layout = serve_layout
+
+# Register callbacks (pass the app and the dataset they read from)
+# (the default view is prerendered after startup, see `start_background_tasks`)
+with profiler.step("register_callbacks"):
+    speculative_renderer = SpeculativeRenderer(SPECULATIVE_WORKERS, SPECULATIVE_MAX_PENDING)
+    register_callbacks(app, dataset_manager, speculative_renderer)
+
+# /api routes for analysts, on the same filtered data and result cache as the callbacks
+init_api(app, dataset_manager)
+
+
+@server.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Reload the dataset in the background (all workers pick it up through the marker file)."""
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        abort(403)
+    dataset_manager.request_reload()
+    return jsonify(status="reloading", version=dataset_manager.current.version), 202
 
 
 if __name__ == "__main__":
-    IS_AZURE = "WEBSITE_HOSTNAME" in os.environ
+    if PROFILE_STARTUP:
+        profiler.uninstall()
+        report, within_budget = profiler.report()
+        print(report)
+        sys.exit(0 if within_budget else 1)
+
+    start_background_tasks()
     app.run_server(
         host="0.0.0.0" if IS_AZURE else "127.0.0.1", 
         port=8000 if IS_AZURE else 8050, 
         debug=not IS_AZURE  # Enables auto-reloading locally, but not in Azure
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,391 @@
+"""
+Load test of concurrent dashboard sessions, in-process or against a running server.
+
+Every simulated session loads the page layout and then replays the callback requests the Dash
+renderer sends for a random sequence of user actions, carrying the outputs of each response
+(filter state, checklist values, render key) into the next request like a browser does:
+
+    toggle      untick or tick one checklist value: filter_data, then update_facet_counts and
+                update_graph for the new filter state
+    drag        move the experience slider in a few steps, one filter chain per step
+    tab         switch tabs: update_graph
+    color_by    change the grouping: update_graph
+    reset       click Reset Filters: the filter chain for the default state
+
+Latency is recorded per callback (per tab for update_graph, as on /metrics) and reported as
+p50/p95/p99 together with the throughput and the result cache hit ratio of the run (read from
+/metrics before and after; against gunicorn, summed over the workers, see metrics.py).
+
+In-process mode imports app.py and runs each session in its own thread on a Flask test client,
+like one worker with many threads. With --url the requests go to a running server instead.
+
+Results are written as JSON. With --baseline, every callback whose p95 got slower than
+--threshold times the baseline p95 is reported and the exit code is 1.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 10] [--actions 20] [--think 0] [--seed 0]
+        [--url http://127.0.0.1:8050] [--rows 100000]
+        [--output benchmarks/results/load.json] [--baseline benchmarks/results/load_baseline.json]
+"""
+import argparse
+import atexit
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from layout import COLOR_BY_OPTIONS, TABS  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results", "load.json")
+UPDATE_PATH = "/_dash-update-component"
+# First output of each callback -> name it is reported under
+CALLBACKS = {
+    "filter-state.data": "filter_data",
+    "job-title-filter.options": "update_facet_counts",
+    "tab-graph.figure": "update_graph",
+}
+CHECKLISTS = ("job-title-filter", "department-filter", "specialist-filter")
+ACTIONS = {"toggle": 0.4, "drag": 0.2, "tab": 0.2, "color_by": 0.1, "reset": 0.1}  # action -> weight
+
+
+class InProcessTransport:
+    """Requests to the app's Flask server through a test client (one per session thread)."""
+
+    def __init__(self, server):
+        self.server = server
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.server.test_client()
+        response = client.open(path, method=method, json=body, headers={"Accept-Encoding": "gzip"})
+        data = response.get_data()
+        if response.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return response.status_code, data
+
+
+class HttpTransport:
+    """Requests to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None):
+        headers = {"Accept-Encoding": "gzip"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, data, encoding = response.status, response.read(), response.headers.get("Content-Encoding")
+        except urllib.error.HTTPError as error:
+            status, data, encoding = error.code, error.read(), error.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            data = gzip.decompress(data)
+        return status, data
+
+
+def _component_props(node, props):
+    """Collect {(id, prop): value} of every component with an id in a serialized layout tree."""
+    if isinstance(node, list):
+        for child in node:
+            _component_props(child, props)
+    elif isinstance(node, dict) and "props" in node:
+        component_id = node["props"].get("id")
+        for prop, value in node["props"].items():
+            if component_id is not None and prop != "children":
+                props[(component_id, prop)] = value
+        _component_props(node["props"].get("children"), props)
+
+
+class Recorder:
+    """Thread-safe latency samples per callback, plus error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.samples[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        """Per callback: count, errors, requests/s and p50/p95/p99/max latency in seconds."""
+        summary = {}
+        for name, samples in sorted(self.samples.items()):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[name] = {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "per_second": len(samples) / elapsed,
+                "p50_s": float(p50),
+                "p95_s": float(p95),
+                "p99_s": float(p99),
+                "max_s": float(max(samples)),
+            }
+        return summary
+
+
+class Session:
+    """One simulated browser session: the page's component props and the callbacks to replay."""
+
+    def __init__(self, transport, dependencies, recorder, rng, think_s):
+        self.transport = transport
+        self.recorder = recorder
+        self.rng = rng
+        self.think_s = think_s
+        self.callbacks = {}
+        for dependency in dependencies:
+            first_output = dependency["output"].strip(".").split("...")[0]
+            if first_output in CALLBACKS:
+                self.callbacks[CALLBACKS[first_output]] = dependency
+        self.props = {}
+        self.all_values = {}
+
+    def _timed(self, name, method, path, body=None):
+        start = time.perf_counter()
+        status, data = self.transport.request(method, path, body)
+        self.recorder.record(name, time.perf_counter() - start, status in (200, 204))
+        return status, data
+
+    def load(self):
+        """Initial page load: the layout with the prerendered default view."""
+        status, data = self._timed("layout", "GET", "/_dash-layout")
+        if status != 200:
+            raise RuntimeError(f"GET /_dash-layout returned {status}")
+        _component_props(json.loads(data), self.props)
+        self.all_values = {checklist: list(self.props[(checklist, "value")]) for checklist in CHECKLISTS}
+
+    def fire(self, name, triggered):
+        """Send one callback request built from the current props and apply its outputs."""
+        dependency = self.callbacks[name]
+        outputs = [
+            dict(zip(("id", "property"), output.rsplit(".", 1)))
+            for output in dependency["output"].strip(".").split("...")
+        ]
+        body = {
+            "output": dependency["output"],
+            "outputs": outputs,
+            "inputs": [dict(item, value=self.props.get((item["id"], item["property"]))) for item in dependency["inputs"]],
+            "state": [dict(item, value=self.props.get((item["id"], item["property"]))) for item in dependency.get("state", [])],
+            "changedPropIds": triggered,
+        }
+        label = f"update_graph/{self.props[('tabs', 'value')]}" if name == "update_graph" else name
+        status, data = self._timed(label, "POST", UPDATE_PATH, body)
+        changed = []
+        if status == 200:
+            for component_id, props in json.loads(data)["response"].items():
+                for prop, value in props.items():
+                    if component_id != "tab-graph":  # Figures (and patches) are not needed again
+                        self.props[(component_id, prop)] = value
+                    changed.append(f"{component_id}.{prop}")
+        return changed
+
+    def filter_chain(self, triggered):
+        """filter_data, then the callbacks the renderer fires for the new filter state."""
+        if "filter-state.data" in self.fire("filter_data", [triggered]):
+            self.fire("update_facet_counts", ["filter-state.data"])
+            self.fire("update_graph", ["filter-state.data"])
+
+    def act(self, action):
+        if action == "toggle":
+            checklist = self.rng.choice(CHECKLISTS)
+            value = self.rng.choice(self.all_values[checklist])
+            selected = self.props[(checklist, "value")]
+            self.props[(checklist, "value")] = [v for v in selected if v != value] if value in selected else selected + [value]
+            self.filter_chain(f"{checklist}.value")
+        elif action == "drag":
+            low, high = self.props[("exp-slider", "value")]
+            for _ in range(self.rng.randint(2, 5)):
+                low = min(max(low + self.rng.randint(-3, 3), 0), 50)
+                high = min(max(high + self.rng.randint(-3, 3), low), 50)
+                self.props[("exp-slider", "value")] = [low, high]
+                self.filter_chain("exp-slider.value")
+        elif action == "tab":
+            self.props[("tabs", "value")] = self.rng.choice([tab for tab in TABS if tab != self.props[("tabs", "value")]])
+            self.fire("update_graph", ["tabs.value"])
+        elif action == "color_by":
+            current = self.props[("color-by-dropdown", "value")]
+            self.props[("color-by-dropdown", "value")] = self.rng.choice([c for c in COLOR_BY_OPTIONS if c != current])
+            self.fire("update_graph", ["color-by-dropdown.value"])
+        elif action == "reset":
+            self.props[("reset-filters", "n_clicks")] = (self.props.get(("reset-filters", "n_clicks")) or 0) + 1
+            self.filter_chain("reset-filters.n_clicks")
+
+    def run(self, n_actions):
+        self.load()
+        for action in self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()), k=n_actions):
+            if self.think_s:
+                time.sleep(self.rng.uniform(0, 2 * self.think_s))
+            self.act(action)
+
+
+def cache_counters(transport):
+    """Result cache hits and misses from /metrics."""
+    _, data = transport.request("GET", "/metrics")
+    counters = {}
+    for line in data.decode("utf-8").splitlines():
+        for key in ("hits", "misses"):
+            if line.startswith(f"dashboard_result_cache_{key}_total "):
+                counters[key] = float(line.split()[1])
+    return counters
+
+
+def run_load(transport, n_sessions, n_actions, think_s, seed):
+    """
+    Run `n_sessions` concurrent sessions of `n_actions` actions each.
+
+    Returns:
+        dict: "sessions", "seconds", "requests", "requests_per_second", "cache_hit_ratio" and
+        per-callback "callbacks" statistics.
+    """
+    status, data = transport.request("GET", "/_dash-dependencies")
+    if status != 200:
+        raise RuntimeError(f"GET /_dash-dependencies returned {status}")
+    dependencies = json.loads(data)
+    recorder = Recorder()
+    failures = []
+
+    def run_session(index):
+        session = Session(transport, dependencies, recorder, random.Random(seed * 100_003 + index), think_s)
+        try:
+            session.run(n_actions)
+        except Exception as error:  # Reported after the run, the other sessions go on
+            failures.append(f"session {index}: {error!r}")
+
+    before = cache_counters(transport)
+    threads = [threading.Thread(target=run_session, args=(i,), name=f"session-{i}") for i in range(n_sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    after = cache_counters(transport)
+
+    hits = after.get("hits", 0) - before.get("hits", 0)
+    misses = after.get("misses", 0) - before.get("misses", 0)
+    callbacks = recorder.summary(elapsed)
+    requests = sum(result["count"] for result in callbacks.values())
+    return {
+        "sessions": n_sessions,
+        "seconds": elapsed,
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "cache_hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "failures": failures,
+        "callbacks": callbacks,
+    }
+
+
+def in_process_transport(n_rows, seed):
+    """Import the app (on `n_rows` synthetic rows if given) and return a transport to its server."""
+    if n_rows:
+        from synthetic_data import generate_salary_data
+
+        # The app reads salary_data.csv from the working directory
+        data_dir = tempfile.mkdtemp(prefix="salary-dashboard-load-")
+        atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+        generate_salary_data(n_rows, seed).to_csv(os.path.join(data_dir, "salary_data.csv"), index=False)
+        os.chdir(data_dir)
+    else:
+        os.chdir(REPO_DIR)
+    import app
+
+    return InProcessTransport(app.server)
+
+
+def compare(results, baseline, threshold):
+    """Callbacks whose p95 latency is more than `threshold` times the baseline p95."""
+    regressions = []
+    for name, result in results["callbacks"].items():
+        reference = baseline["callbacks"].get(name)
+        if reference is not None and result["p95_s"] > reference["p95_s"] * threshold:
+            regressions.append((name, reference["p95_s"], result["p95_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated sessions")
+    parser.add_argument("--actions", type=int, default=20, help="user actions per session after the page load")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between actions in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--rows", type=int, help="in-process only: use this many synthetic rows instead of salary_data.csv")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="earlier results file to flag latency regressions against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p95 slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    transport = HttpTransport(args.url) if args.url else in_process_transport(args.rows, args.seed)
+    results = run_load(transport, args.sessions, args.actions, args.think, args.seed)
+
+    print(f"{'callback':<30} {'count':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results["callbacks"].items():
+        print(
+            f"{name:<30} {result['count']:>7} {result['errors']:>6} {result['per_second']:>8.1f} "
+            f"{result['p50_s'] * 1000:>9.2f} {result['p95_s'] * 1000:>9.2f} {result['p99_s'] * 1000:>9.2f}"
+        )
+    hit_ratio = results["cache_hit_ratio"]
+    print(
+        f"{results['sessions']} sessions, {results['requests']} requests in {results['seconds']:.2f}s "
+        f"({results['requests_per_second']:.1f} req/s), result cache hit ratio "
+        + (f"{hit_ratio:.1%}" if hit_ratio is not None else "n/a")
+    )
+    for failure in results["failures"]:
+        print(f"❌ ERROR: {failure}")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": args.url or "in-process",
+            "rows": args.rows,
+            "actions": args.actions,
+            "think_s": args.think,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote results to {output}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current in regressions:
+            print(f"⚠️ REGRESSION {name}: p95 {previous * 1000:.2f} ms -> {current * 1000:.2f} ms ({current / previous:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No p95 regressions over {args.threshold}x against {args.baseline}")
+    return 1 if results["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
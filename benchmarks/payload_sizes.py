@@ -0,0 +1,112 @@
+"""
+Size of the `update_graph` payload per tab on synthetic datasets.
+
+For every tab, the full figure (or statistics table) and the incremental patch of the graph
+tabs are encoded the way Dash encodes a callback response, for a few filter states per dataset
+size, and measured as JSON and after gzip and brotli (brotli only if the optional package is
+installed):
+
+    figure/<tab>    response to a tab switch
+    patch/<tab>     response to a filter change on the same tab
+
+Results are written as JSON. With --baseline, every payload that grew by more than --threshold
+times its baseline size is reported and the exit code is 1.
+
+Usage:
+    python benchmarks/payload_sizes.py [--sizes 240,10000,100000,1000000]
+        [--output benchmarks/results/payload.json] [--baseline benchmarks/results/payload_baseline.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from callbacks import render_graph, update_statistics_table  # noqa: E402
+from compression import brotli, compress  # noqa: E402
+from dataset import DashboardData, prepare_frame  # noqa: E402
+from layout import TABS  # noqa: E402
+from run_benchmarks import COLOR_BY, DEFAULT_SIZES, filter_states  # noqa: E402
+from synthetic_data import generate_salary_data  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "payload.json")
+
+
+def payload_sizes(value):
+    """Bytes of a callback output as JSON, gzip and (if available) brotli."""
+    body = to_json_plotly(value).encode("utf-8")
+    sizes = {"json_bytes": len(body), "gzip_bytes": len(compress(body, "gzip"))}
+    if brotli is not None:
+        sizes["br_bytes"] = len(compress(body, "br"))
+    return sizes
+
+
+def payloads_for_size(n_rows, seed):
+    """Payload sizes for one synthetic dataset, keyed "<rows>/<figure|patch>/<tab>/<state>"."""
+    data = DashboardData(prepare_frame(generate_salary_data(n_rows, seed)))
+    results = {}
+    for name, state in filter_states(data).items():
+        for tab in TABS:
+            if tab == "statistics":
+                outputs = {"figure": update_statistics_table.uncached(data.salary_stats, state, COLOR_BY)}
+            else:
+                outputs = {
+                    "figure": render_graph.uncached(data, state, tab, COLOR_BY, False),
+                    "patch": render_graph.uncached(data, state, tab, COLOR_BY, True),
+                }
+            for kind, value in outputs.items():
+                if value is not None:  # No histogram for an empty selection
+                    results[f"{n_rows}/{kind}/{tab}/{name}"] = payload_sizes(value)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Payloads whose gzip size is more than `threshold` times the baseline size."""
+    growths = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is not None and result["gzip_bytes"] > reference["gzip_bytes"] * threshold:
+            growths.append((key, reference["gzip_bytes"], result["gzip_bytes"]))
+    return growths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated row counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="earlier results file to flag payload growth against")
+    parser.add_argument("--threshold", type=float, default=1.1, help="growth ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for n_rows in map(int, args.sizes.split(",")):
+        size_results = payloads_for_size(n_rows, args.seed)
+        for key, sizes in size_results.items():
+            print(f"{key:<45} " + "  ".join(f"{encoding.removesuffix('_bytes')} {size:>9,}" for encoding, size in sizes.items()))
+        results.update(size_results)
+
+    report = {"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed}, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        growths = compare(results, baseline, args.threshold)
+        for key, previous, current in growths:
+            print(f"⚠️ REGRESSION {key}: {previous:,} -> {current:,} gzip bytes ({current / previous:.2f}x)")
+        if growths:
+            return 1
+        print(f"No payload grew over {args.threshold}x against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks of the dashboard's data paths on synthetic datasets.
+
+Every benchmark calls the uncached function behind a callback stage (the result cache would
+otherwise answer all repeats), for a few filter states per dataset size:
+
+    get_filtered_data       row selection from the bitmap index
+    update_filter_options   checklist counts from the facet cube
+    trendlines              trendline fits per color group from the sufficient statistics
+    figure/<tab>            full figure (or statistics table) for each tab
+    patch/<tab>             incremental figure update for the graph tabs
+    build                   DashboardData indexes, once per size
+
+Results are written as JSON. With --baseline, every benchmark whose median got slower than
+--threshold times the baseline median is reported and the exit code is 1.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 240,10000,100000,1000000] [--repeat 7]
+        [--output benchmarks/results/latest.json] [--baseline benchmarks/results/baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_config import filter_state_key  # noqa: E402
+from callbacks import get_filtered_data, update_filter_options, update_statistics_table, render_graph  # noqa: E402
+from dataset import DashboardData, prepare_frame  # noqa: E402
+from synthetic_data import generate_salary_data  # noqa: E402
+
+DEFAULT_SIZES = (240, 10_000, 100_000, 1_000_000)
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+GRAPH_TABS = ("scatterplot2", "histogram")
+COLOR_BY = "Job Title"
+# Differences below this are timer noise, not regressions
+MIN_REGRESSION_SECONDS = 0.0005
+
+
+def filter_states(data):
+    """Filter states to benchmark: everything selected, a typical subset and an empty selection."""
+    labels = data.cube.labels
+    exp_min = data.cube.exp_min
+    exp_max = exp_min + data.cube.shape[-1] - 1
+    return {
+        "all": filter_state_key(labels["Job Title"], labels["Department"], labels["Specialist eller ST-fysiker"], [exp_min, exp_max]),
+        "subset": filter_state_key(labels["Job Title"][:2], labels["Department"][:2], ["Specialist"], [5, 20]),
+        "empty": filter_state_key([], labels["Department"], labels["Specialist eller ST-fysiker"], [exp_min, exp_max]),
+    }
+
+
+def time_call(func, repeat):
+    """Run `func` once to warm up, then `repeat` times; returns summary statistics in seconds."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "mean_s": statistics.fmean(timings),
+        "runs": repeat,
+    }
+
+
+def benchmark_size(n_rows, seed, repeat):
+    """All benchmarks for one synthetic dataset, keyed "<rows>/<benchmark>/<state>"."""
+    df = prepare_frame(generate_salary_data(n_rows, seed))
+    results = {}
+
+    start = time.perf_counter()
+    data = DashboardData(df)
+    results[f"{n_rows}/build"] = {"median_s": time.perf_counter() - start, "runs": 1}
+
+    for name, state in filter_states(data).items():
+        rows = get_filtered_data.uncached(data.engine, state)
+        cases = {
+            "get_filtered_data": lambda: get_filtered_data.uncached(data.engine, state),
+            "update_filter_options": lambda: update_filter_options.uncached(data.cube, state),
+            "trendlines": lambda: data.trend_model.trendlines(state, COLOR_BY),
+            "figure/statistics": lambda: update_statistics_table.uncached(data.salary_stats, state, COLOR_BY),
+        }
+        for tab in GRAPH_TABS:
+            cases[f"figure/{tab}"] = lambda tab=tab: render_graph.uncached(data, state, tab, COLOR_BY, False)
+            cases[f"patch/{tab}"] = lambda tab=tab: render_graph.uncached(data, state, tab, COLOR_BY, True)
+        for benchmark, func in cases.items():
+            results[f"{n_rows}/{benchmark}/{name}"] = dict(time_call(func, repeat), filtered_rows=len(rows))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose median is more than `threshold` times the baseline median."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        current, previous = result["median_s"], reference["median_s"]
+        if current > previous * threshold and current - previous > MIN_REGRESSION_SECONDS:
+            regressions.append((key, previous, current))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated row counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="earlier results file to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for n_rows in map(int, args.sizes.split(",")):
+        size_results = benchmark_size(n_rows, args.seed, args.repeat)
+        for key, result in size_results.items():
+            print(f"{key:<55} {result['median_s'] * 1000:10.3f} ms")
+        results.update(size_results)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, previous, current in regressions:
+            print(f"⚠️ REGRESSION {key}: {previous * 1000:.3f} ms -> {current * 1000:.3f} ms ({current / previous:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.threshold}x against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Seeded synthetic salary data with the columns of salary_data.csv.
+
+Category values and frequencies follow the real survey (5 job titles, 4 workplaces plus a few
+missing, 3 specialist levels), experience is skewed towards the first 20 years and salaries grow
+with experience, job title and specialist level. The same seed and size always give the same rows.
+
+Usage:
+    python benchmarks/synthetic_data.py n_rows [output.csv] [seed]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# (value, share) per category column, from the 240-row survey export
+JOB_TITLES = [
+    ("Sjukhusfysiker", 0.81),
+    ("Annan befattning", 0.07),
+    ("Sjukhusfysiker, förste", 0.06),
+    ("Chef", 0.03),
+    ("Doktorand med tjänst", 0.03),
+]
+WORKPLACES = [
+    ("Universitetssjukhus", 0.59),
+    ("Övriga sjukhus", 0.31),
+    ("Annan arbetsplats", 0.07),
+    ("Universitet", 0.025),
+    (None, 0.005),
+]
+SPECIALIST_LEVELS = [("Specialist", 0.49), ("ST-fysiker", 0.28), ("Nej", 0.23)]
+DEGREES = [(None, 0.66), ("Doktorsutbildning/examen", 0.32), ("Licentiatutbildning/examen", 0.02)]
+
+# Monthly salary on top of the experience-based base salary
+JOB_PREMIUM = {
+    "Sjukhusfysiker": 0,
+    "Annan befattning": 4000,
+    "Sjukhusfysiker, förste": 9000,
+    "Chef": 14000,
+    "Doktorand med tjänst": -6000,
+}
+SPECIALIST_PREMIUM = {"Specialist": 4000, "ST-fysiker": -2000, "Nej": 0}
+
+# Supplement columns: (column, share of rows with a value, share of those that are non-zero, typical amounts)
+SUPPLEMENTS = [
+    ("Fast tillägg per månad", 0.30, 0.42, [500, 1000, 1500, 2000, 3000, 4000]),
+    ("Förmåner per månad", 0.18, 0.07, [250, 300, 6000]),
+    ("Rörlig lön per månad", 0.18, 0.05, [2000, 6900, 20000]),
+    ("Jour och beredskap per månad", 0.18, 0.10, [300, 528, 6000]),
+]
+
+
+def _choice(rng, weighted_values, n_rows):
+    values = [value for value, _ in weighted_values]
+    shares = np.array([share for _, share in weighted_values])
+    return np.array(values, dtype=object)[rng.choice(len(values), size=n_rows, p=shares / shares.sum())]
+
+
+def generate_salary_data(n_rows, seed=0):
+    """
+    Raw salary survey rows, as read from salary_data.csv (Swedish column names, NaN for blanks).
+
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: The generated rows, ready for `dataset.prepare_frame`.
+    """
+    rng = np.random.default_rng(seed)
+
+    jobs = _choice(rng, JOB_TITLES, n_rows)
+    specialist = _choice(rng, SPECIALIST_LEVELS, n_rows)
+    experience = np.clip(np.round(rng.gamma(2.2, 6.2, n_rows)), 0, 45).astype(np.int64)
+    senior = np.where(rng.random(n_rows) < 0.05 + 0.004 * experience, "Ja", "Nej")
+
+    base = 36000 + 1100 * experience - 9 * experience ** 2
+    base = base + np.vectorize(JOB_PREMIUM.get)(jobs) + np.vectorize(SPECIALIST_PREMIUM.get)(specialist)
+    base = base + rng.normal(0, 5000, n_rows)
+    base = (np.clip(base, 28000, 120000) // 25 * 25).astype(np.int64)
+
+    df = pd.DataFrame({
+        "Befattning": jobs,
+        "Arbetsplats": _choice(rng, WORKPLACES, n_rows),
+        "Antal hela år med arbete i klinisk verksamhet": experience,
+        "Specialist eller ST-fysiker": specialist,
+        "Översjukhusfysiker enl. nationell kompetensstege": senior,
+        "Högre examen ": _choice(rng, DEGREES, n_rows),
+        "Grundlön okt 2024": base,
+    })
+
+    total = base.astype(float)
+    for column, answered_share, nonzero_share, amounts in SUPPLEMENTS:
+        answered = rng.random(n_rows) < answered_share
+        nonzero = answered & (rng.random(n_rows) < nonzero_share)
+        values = np.where(answered, 0.0, np.nan)
+        values[nonzero] = rng.choice(amounts, size=int(nonzero.sum()))
+        df[column] = values
+        total += np.nan_to_num(values)
+
+    df["Månadslön totalt"] = total.astype(np.int64)
+    return df
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1])
+    output = sys.argv[2] if len(sys.argv) > 2 else f"salary_data_{n_rows}.csv"
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    generate_salary_data(n_rows, seed).to_csv(output, index=False)
+    print(f"Wrote {n_rows} rows to {output}")
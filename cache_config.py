@@ -1,7 +1,259 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+import pandas as pd
 from flask_caching import Cache
 
-cache = Cache(config={"CACHE_TYPE": "filesystem", "CACHE_DIR": "/tmp"})
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process claim lock
+    fcntl = None
+
+logger = logging.getLogger("salary_dashboard")
+
+# Single source of truth for the flask-caching backend (init_cache used to silently override it)
+CACHE_CONFIG = {"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 300}
+
+cache = Cache(config=CACHE_CONFIG)
+
+
+def shared_cache_config(backend, redis_url=None, cache_dir=None):
+    """
+    flask-caching config for a cache backend name.
+
+    Args:
+        backend (str): "redis" (shared between hosts), "filesystem" (shared between the workers
+            of one host) or "simple" (one cache per process).
+        redis_url (str | None): Redis URL for the "redis" backend.
+        cache_dir (str | None): Directory for the "filesystem" backend.
+    """
+    if backend == "redis":
+        try:
+            import redis  # noqa: F401  (imported by flask-caching's RedisCache)
+        except ImportError:
+            raise ImportError("The redis cache backend (CACHE_REDIS_URL) needs the redis package: pip install redis") from None
+        return dict(CACHE_CONFIG, CACHE_TYPE="RedisCache", CACHE_REDIS_URL=redis_url, CACHE_KEY_PREFIX="salary-dashboard:")
+    if backend == "filesystem":
+        return dict(CACHE_CONFIG, CACHE_TYPE="FileSystemCache", CACHE_DIR=cache_dir, CACHE_THRESHOLD=2000)
+    if backend == "simple":
+        return dict(CACHE_CONFIG)
+    raise ValueError(f"Unknown cache backend {backend!r}, expected redis, filesystem or simple")
+
+
+def init_cache(app, config=CACHE_CONFIG):
+    """
+    Attach cache to Dash app.
+
+    With a backend that is shared between processes, `result_cache` also reads and writes
+    through it, so every worker can reuse results computed by the others.
+    """
+    cache.init_app(app.server, config=config)  # Attach to Flask server
+    if config["CACHE_TYPE"] != "SimpleCache":
+        result_cache.shared = app.server.extensions["cache"][cache]
+    if config["CACHE_TYPE"] == "FileSystemCache":
+        # Its add() is not atomic between processes, so claims are taken under a lock file
+        result_cache.claim_lock_path = os.path.join(config["CACHE_DIR"], "claims.lock")
+
+
+_MISSING = object()
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached value in bytes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, "to_plotly_json"):  # Dash components and plotly figures
+        return estimate_size(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with a memory budget.
+
+    Entries are evicted least-recently-used first once either the number of entries or the
+    estimated total size goes over budget. Hit, miss and eviction counts are kept for monitoring.
+
+    If `shared` is set to a cachelib backend (see `init_cache`), memoized results missing locally
+    are looked up there and new results are written to it as well. Errors of the shared backend
+    only cost a recomputation.
+    """
+
+    def __init__(self, max_bytes, max_entries=10_000, shared=None, claim_lock_path=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.shared = shared
+        self.claim_lock_path = claim_lock_path
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if size > self.max_bytes:
+                return  # Would evict everything else, not worth caching
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def evict_version(self, version):
+        """Drop every memoized result of a dataset version (see `memoize` for the key layout)."""
+        with self._lock:
+            for key in [key for key in self._entries if isinstance(key, tuple) and len(key) > 1 and key[1] == version]:
+                _, size = self._entries.pop(key)
+                self.current_bytes -= size
+
+    def _get_shared(self, key):
+        try:
+            value = self.shared.get(_shared_key(key))
+        except Exception:  # A shared backend that is down must not take the dashboard with it
+            logger.warning("Shared cache read failed", exc_info=True)
+            return _MISSING
+        if value is None:
+            return _MISSING
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def _set_shared(self, key, value):
+        try:
+            self.shared.set(_shared_key(key), value)
+        except Exception:
+            logger.warning("Shared cache write failed", exc_info=True)
+
+    def claim(self, name):
+        """
+        Claim a one-off job (such as a cache warm-up) among all processes sharing the cache.
+
+        Without a shared backend every process has its own cache and always gets the claim.
+        Otherwise only the first process to claim `name` does, until the claim expires together
+        with the results it produced (the backend's default timeout). If the shared backend
+        fails, the caller does the job itself.
+
+        Returns:
+            bool: True if the caller should do the job.
+        """
+        if self.shared is None:
+            return True
+        try:
+            with _file_lock(self.claim_lock_path):
+                return bool(self.shared.add("claim:" + name, os.getpid()))
+        except Exception:
+            logger.warning("Shared cache claim failed", exc_info=True)
+            return True
+
+    def stats(self):
+        """Counters for monitoring: hits, misses, evictions, entries and bytes in use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "shared_hits": self.shared_hits,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def memoize(self, func):
+        """
+        Memoize `func(engine, state, *args)` on (function name, dataset version, state, *args).
+
+        `engine` can be any object with a `version` attribute, `state` must be a canonical
+        filter-state tuple (see `filter_state_key`) and further arguments must be hashable.
+        """
+        @wraps(func)
+        def wrapper(engine, state, *args):
+            key = (func.__qualname__, engine.version, state) + args
+            result = self.get(key, _MISSING)
+            if result is _MISSING and self.shared is not None:
+                result = self._get_shared(key)
+                if result is not _MISSING:
+                    self.set(key, result)
+            if result is _MISSING:
+                result = func(engine, state, *args)
+                self.set(key, result)
+                if self.shared is not None:
+                    self._set_shared(key, result)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on a file across processes (no lock without a path or without `fcntl`)."""
+    if path is None or fcntl is None:
+        yield
+        return
+    with open(path, "a", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _shared_key(key):
+    """String key for a shared backend; the key tuple only holds str/int/bool/None/tuples, whose repr is stable."""
+    return "result:" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+# Filter results are keyed on the dataset version plus the filter state instead of hashing DataFrames
+result_cache = LRUCache(max_bytes=int(os.environ.get("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
 
-def init_cache(app):
-    """Attach cache to Dash app"""
-    cache.init_app(app.server, config={"CACHE_TYPE": "simple"})  # Attach to Flask server
+def filter_state_key(selected_jobs, selected_depts, selected_specialists, exp_range):
+    """Canonical, hashable filter state: sorted value tuples plus an integer experience range."""
+    return (
+        tuple(sorted(selected_jobs)),
+        tuple(sorted(selected_depts)),
+        tuple(sorted(selected_specialists)),
+        tuple(map(int, exp_range)) if exp_range else None,
+    )
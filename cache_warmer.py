@@ -0,0 +1,121 @@
+"""
+Background warming of the result cache for the filter states visitors are most likely to ask for.
+
+After startup and after every dataset swap, a thread computes the callback outputs (filtered
+rows, checklist counts, the figure or statistics table of every tab for every grouping) of:
+everything selected, each single job title, each single department and each single specialist
+value, all with the default experience range. Warming stops at the time or memory budget, or
+when a newer dataset version starts its own warm-up. With a cache shared between workers, one
+worker warms each version and the others read its results (see `LRUCache.claim`).
+"""
+import logging
+import threading
+import time
+
+from cache_config import filter_state_key, result_cache
+from callbacks import default_selection, get_filtered_data, render_graph, update_filter_options, update_statistics_table
+from layout import COLOR_BY_OPTIONS, DEFAULT_EXP_RANGE, TABS
+from metrics import metrics
+
+logger = logging.getLogger("salary_dashboard")
+
+
+def popular_states(data):
+    """Filter states to warm, most popular first: all selected, then one value of one checklist."""
+    jobs, depts, specialists = default_selection(data)
+    states = [filter_state_key(jobs, depts, specialists, DEFAULT_EXP_RANGE)]
+    states += [filter_state_key([job], depts, specialists, DEFAULT_EXP_RANGE) for job in data.cube.labels["Job Title"]]
+    states += [filter_state_key(jobs, [dept], specialists, DEFAULT_EXP_RANGE) for dept in data.cube.labels["Department"]]
+    states += [filter_state_key(jobs, depts, [specialist], DEFAULT_EXP_RANGE) for specialist in specialists]
+    return states
+
+
+def warm_state(data, state, tab, color_by):
+    """Compute (and so cache) every output the callbacks produce for one state, tab and grouping."""
+    get_filtered_data(data.engine, state)
+    update_filter_options(data.cube, state)
+    if tab == "statistics":
+        update_statistics_table(data.salary_stats, state, color_by)
+    else:
+        # Full figure for a tab switch, patch for a filter change on the same tab
+        render_graph(data, state, tab, color_by, False)
+        render_graph(data, state, tab, color_by, True)
+
+
+class CacheWarmer:
+    """
+    Runs `warm` for the current dataset in a background thread, within a time and memory budget.
+
+    The memory budget bounds how much the estimated size of the result cache may grow during
+    one warm-up. `last_report` holds the outcome of the latest run.
+    """
+
+    def __init__(self, time_budget_s=30.0, memory_budget_bytes=16 * 1024 * 1024):
+        self.time_budget_s = time_budget_s
+        self.memory_budget_bytes = memory_budget_bytes
+        self.last_report = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def warm(self, data, generation=None):
+        """
+        Warm the cache for a dataset in the calling thread.
+
+        Returns:
+            dict: "version", "warmed" and "total" (state × tab × grouping combinations),
+            "seconds", "bytes" added to the cache and "stopped" (why it stopped early, or None).
+        """
+        start_time = time.perf_counter()
+        start_bytes = result_cache.stats()["bytes"]
+        tasks = [(state, tab, color_by) for state in popular_states(data) for tab in TABS for color_by in COLOR_BY_OPTIONS]
+
+        warmed = 0
+        stopped = None
+        for state, tab, color_by in tasks:
+            if generation is not None and generation != self._generation:
+                stopped = "superseded"
+            elif time.perf_counter() - start_time > self.time_budget_s:
+                stopped = "time budget"
+            elif result_cache.stats()["bytes"] - start_bytes > self.memory_budget_bytes:
+                stopped = "memory budget"
+            if stopped:
+                break
+            warm_state(data, state, tab, color_by)
+            warmed += 1
+            time.sleep(0)  # Let request threads run between tasks
+
+        report = {
+            "version": data.version,
+            "warmed": warmed,
+            "total": len(tasks),
+            "seconds": time.perf_counter() - start_time,
+            "bytes": result_cache.stats()["bytes"] - start_bytes,
+            "stopped": stopped,
+        }
+        self.last_report = report
+        metrics.set_gauge("dashboard_cache_warmed_states", "State, tab and grouping combinations warmed by the latest warm-up.", warmed)
+        logger.info(
+            "Warmed %d of %d states for version %s in %.2fs (%s)",
+            warmed, len(tasks), data.version, report["seconds"], stopped or "complete",
+        )
+        return report
+
+    def _warm_logged(self, data, generation):
+        try:
+            self.warm(data, generation)
+        except Exception:
+            logger.exception("Cache warm-up failed for %r", data)
+
+    def start(self, data):
+        """Warm the cache for `data` in a background thread (0 s time budget disables warming)."""
+        if self.time_budget_s <= 0:
+            return None
+        with self._lock:
+            self._generation += 1  # A running warm-up of an older dataset stops at its next task
+            generation = self._generation
+        if not result_cache.claim(f"warm:{data.version}"):
+            logger.info("Cache warm-up for version %s runs in another worker", data.version)
+            return None
+        thread = threading.Thread(target=self._warm_logged, args=(data, generation), name="cache-warmer", daemon=True)
+        thread.start()
+        return thread
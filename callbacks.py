@@ -1,328 +1,314 @@
-import colorsys
-import html
-from dash import Input, Output, State, dcc, html, callback_context
+from functools import partial
+from dash import Input, Output, State, html, callback_context, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from cache_config import cache
-import time
-import numpy as np
-import statsmodels.api as sm
-from statistics_module import compute_trendline
-
-idx_to_color = {
-    0: "blue",
-    1: "red",
-    2: "green",
-    3: "purple",
-    4: "orange"
-}
-# color_variants = {
-#     'blue': {'opaque': 'rgba(31, 119, 180, 1.0)', 'faded': 'rgba(31, 119, 180, 0.2)', 'darker': 'rgba(24, 95, 144, 1.0)'},
-#     'red': {'opaque': 'rgba(214, 39, 40, 1.0)', 'faded': 'rgba(214, 39, 40, 0.2)', 'darker': 'rgba(171, 31, 31, 1.0)'},
-#     'green': {'opaque': 'rgba(44, 160, 44, 1.0)', 'faded': 'rgba(44, 160, 44, 0.2)', 'darker': 'rgba(35, 128, 35, 1.0)'},
-#     'purple': {'opaque': 'rgba(148, 103, 189, 1.0)', 'faded': 'rgba(148, 103, 189, 0.2)', 'darker': 'rgba(118, 70, 162, 1.0)'},
-#     'orange': {'opaque': 'rgba(255, 127, 14, 1.0)', 'faded': 'rgba(255, 127, 14, 0.2)', 'darker': 'rgba(215, 100, 0, 1.0)'}
-#     'cyan': 
-# }
-
-color_variants = {
-    'blue': {'opaque': 'rgba(99, 110, 250, 1.0)', 'faded': 'rgba(99, 110, 250, 0.2)', 'darker': 'rgba(79, 88, 200, 1.0)'},
-    'red': {'opaque': 'rgba(239, 85, 56, 1.0)', 'faded': 'rgba(239, 85, 56, 0.2)', 'darker': 'rgba(191, 68, 45, 1.0)'},
-    'green': {'opaque': 'rgba(0, 204, 150, 1.0)', 'faded': 'rgba(0, 204, 150, 0.2)', 'darker': 'rgba(0, 163, 120, 1.0)'},
-    'purple': {'opaque': 'rgba(171, 99, 250, 1.0)', 'faded': 'rgba(171, 99, 250, 0.2)', 'darker': 'rgba(137, 79, 200, 1.0)'},
-    'orange': {'opaque': 'rgba(255, 161, 90, 1.0)', 'faded': 'rgba(255, 161, 90, 0.2)', 'darker': 'rgba(204, 129, 72, 1.0)'},
-    'cyan': {'opaque': 'rgba(25, 211, 243, 1.0)', 'faded': 'rgba(25, 211, 243, 0.2)', 'darker': 'rgba(20, 169, 195, 1.0)'}
-}
-
-
-@cache.memoize(timeout=300)
-def get_filtered_data(selected_jobs, selected_depts, selected_specialists, exp_range, df):
-    print("\tRunning get_filtered_data")
-    print(f"\tSelected Jobs: {selected_jobs}\n")
-
-    # Apply filters
-    filtered_dff = df.copy()
-    filtered_dff = filtered_dff[filtered_dff["Department"].isin(selected_depts)]
-    filtered_dff = filtered_dff[filtered_dff["Job Title"].isin(selected_jobs)]
-    filtered_dff = filtered_dff[filtered_dff["Specialist eller ST-fysiker"].isin(selected_specialists)]
-    if exp_range:
-        filtered_dff = filtered_dff[
-            (filtered_dff["ExperienceYears"] >= exp_range[0]) & (filtered_dff["ExperienceYears"] <= exp_range[1])
-        ]
-
-    return filtered_dff
-
-def get_filtered_data_wrapper(selected_jobs, selected_depts, selected_specialists, exp_range, df):
-    return get_filtered_data(
-                  tuple(sorted(selected_jobs)), 
-                  tuple(sorted(selected_depts)), 
-                  tuple(sorted(selected_specialists)), 
-                  tuple(map(int, exp_range)),
-                  df)
-
-@cache.memoize(timeout=300)
-def update_filter_options(filtered_dff, df):
-    print("Running update_filter_options\n")
-
-    # Count occurrences in the already filtered dataframe
-    job_counts = filtered_dff["Job Title"].value_counts().to_dict()
-    dept_counts = filtered_dff["Department"].value_counts().to_dict()
-    specialist_counts = filtered_dff["Specialist eller ST-fysiker"].value_counts().to_dict()
-
-    # Get all unique job titles, departments, and specialists (from full dataset)
-    all_jobs = sorted(df["Job Title"].fillna("Not Specified").unique())
-    all_depts = sorted(df["Department"].fillna("Not Specified").unique())
+from cache_config import result_cache, filter_state_key
+from statistics_module import SALARY_STATISTICS
+from metrics import metrics, logger
+from layout import DEFAULT_TAB, DEFAULT_COLOR_BY, DEFAULT_EXP_RANGE, TABS
+from serialization import compact_figure
+from speculative import SpeculativeRenderer
+
+
+@result_cache.memoize
+def get_filtered_data(engine, state):
+    logger.debug("Running get_filtered_data, selected jobs: %s", state[0])
+
+    # Apply filters by intersecting the precomputed bitmaps; only the row positions are cached
+    return engine.select(*state)
+
+def get_filtered_data_wrapper(selected_jobs, selected_depts, selected_specialists, exp_range, engine):
+    state = filter_state_key(selected_jobs, selected_depts, selected_specialists, exp_range)
+    return state, get_filtered_data(engine, state)
+
+@result_cache.memoize
+def update_filter_options(cube, state):
+    logger.debug("Running update_filter_options")
+
+    # Count occurrences for the filter state from the precomputed facet cube
+    counts = cube.facet_counts(state)
+    job_counts = counts["Job Title"]
+    dept_counts = counts["Department"]
+    specialist_counts = counts["Specialist eller ST-fysiker"]
+
+    # All unique job titles and departments (from full dataset, built once with the cube)
+    all_jobs = cube.labels["Job Title"]
+    all_depts = cube.labels["Department"]
     all_specialists = ["Specialist", "ST-fysiker", "Nej"]
 
-    # Ensure "Not Specified" is included
-    job_counts["Not Specified"] = job_counts.get("Not Specified", 0)
-    dept_counts["Not Specified"] = dept_counts.get("Not Specified", 0)
-
-    # Create checklist options with updated counts
-    job_options = [{"label": html.Span(f"{job} ({job_counts.get(job, 0)})", style={"margin-left": "8px"}), "value": job} for job in all_jobs]
-    dept_options = [{"label": html.Span(f"{dept} ({dept_counts.get(dept, 0)})", style={"margin-left": "8px"}), "value": dept} for dept in all_depts]
-    specialist_options = [{"label": html.Span(f"{spec} ({specialist_counts.get(spec, 0)})", style={"margin-left": "8px"}), "value": spec} for spec in all_specialists]
+    # Create checklist options with updated counts (plain text, spaced by CHECKLIST_INPUT_STYLE)
+    job_options = [{"label": f"{job} ({job_counts.get(job, 0)})", "value": job} for job in all_jobs]
+    dept_options = [{"label": f"{dept} ({dept_counts.get(dept, 0)})", "value": dept} for dept in all_depts]
+    specialist_options = [{"label": f"{spec} ({specialist_counts.get(spec, 0)})", "value": spec} for spec in all_specialists]
 
     return job_options, dept_options, specialist_options
 
-def register_callbacks(app, df):
-    # Update graph based on filters and active tab
+@result_cache.memoize
+def update_statistics_table(salary_stats, state, color_by):
+    full = salary_stats.full
+    filtered = salary_stats.filtered(state)
+
+    # Create table rows as a list: count, salary statistics, then experience
+    table_rows = [
+        html.Tr([
+            html.Td("Number of entries", style={"text-align": "right"}),
+            html.Td(f"{full['count']}", style={"text-align": "right"}),
+            html.Td(f"{filtered['count']}", style={"text-align": "right"})
+        ])
+    ]
+    for label, _ in SALARY_STATISTICS:
+        style = {"text-align": "right"}
+        if label == "Median salary":
+            style = {"text-align": "right", "border-bottom": "2px solid black", "border-top": "2px solid black"}
+        table_rows.append(html.Tr([
+            html.Td(label, style=style),
+            html.Td(f"{full[label]:,.0f}", style=style),
+            html.Td(f"{filtered[label]:,.0f}", style=style)
+        ]))
+    table_rows.append(html.Tr([
+        html.Td("Average experience (years)", style={"text-align": "right"}),
+        html.Td(f"{full['Average experience (years)']:.1f}", style={"text-align": "right"}),
+        html.Td(f"{filtered['Average experience (years)']:.1f}", style={"text-align": "right"})
+    ]))
+
+    header_style = {"text-align": "right", "min-width": "120px", "white-space": "nowrap"}
+
+    # Per-group breakdown of the filtered set, grouped like the scatterplot colors
+    group_rows = [
+        html.Tr([
+            html.Td(group["group"], style={"text-align": "left"}),
+            html.Td(f"{group['count']}", style={"text-align": "right"}),
+            html.Td(f"{group['25th percentile salary']:,.0f}", style={"text-align": "right"}),
+            html.Td(f"{group['Median salary']:,.0f}", style={"text-align": "right"}),
+            html.Td(f"{group['Average salary']:,.0f}", style={"text-align": "right"}),
+            html.Td(f"{group['75th percentile salary']:,.0f}", style={"text-align": "right"})
+        ])
+        for group in salary_stats.by_group(state, color_by)
+    ]
+
+    # Create the tables
+    stats_table = html.Div(
+        [
+            dbc.Table(
+                [
+                    html.Thead(html.Tr([
+                        html.Th("Metric", style={"text-align": "right", "min-width": "150px", "white-space": "nowrap"}),  
+                        html.Th("Full Set", style=header_style),  
+                        html.Th("Filtered Set", style=header_style)
+                    ])),
+                    html.Tbody(table_rows)
+                ],
+                bordered=True,
+                striped=True,
+                hover=True,
+                className="mb-4",
+                style={"width": "auto"}
+            ),
+            dbc.Table(
+                [
+                    html.Thead(html.Tr([
+                        html.Th(color_by, style={"text-align": "left", "min-width": "150px", "white-space": "nowrap"}),
+                        html.Th("Entries", style=header_style),
+                        html.Th("25th percentile", style=header_style),
+                        html.Th("Median", style=header_style),
+                        html.Th("Average", style=header_style),
+                        html.Th("75th percentile", style=header_style)
+                    ])),
+                    html.Tbody(group_rows)
+                ],
+                bordered=True,
+                striped=True,
+                hover=True,
+                className="mb-4",
+                style={"width": "auto"}
+            )
+        ],
+        style={"display": "flex", "flex-direction": "column", "align-items": "center", "margin-top": "40px"}
+    )
+    return stats_table
+
+@result_cache.memoize
+def render_graph(data, state, selected_tab, color_by, incremental):
+    """
+    Figure for a graph tab (as a compact dict, see `serialization.py`), or a Patch for the
+    figure already in the browser if `incremental`.
+
+    Returns None when the histogram has no rows to show.
+    """
+    # plotly.graph_objects is only loaded once a graph tab is first rendered, not at startup
+    from figures import build_scatter_figure, scatter_patch, build_histogram_figure, histogram_patch
+
+    if selected_tab == "histogram":
+        salaries = data.salary_stats.sorted_salaries(state)
+        if len(salaries) == 0:
+            return None
+        return histogram_patch(salaries) if incremental else compact_figure(build_histogram_figure(salaries))
+
+    rows = get_filtered_data(data.engine, state)
+
+    trendlines = data.trend_model.trendlines(state, color_by)
+    if incremental:
+        return scatter_patch(data.engine, rows, color_by, trendlines)
+    return compact_figure(build_scatter_figure(data.engine, rows, color_by, trendlines))
+
+def default_selection(data):
+    """Checklist values of the default view and after a reset: everything selected."""
+    selected_jobs = data.df["Job Title"].dropna().unique().tolist()
+    selected_depts = data.df["Department"].dropna().unique().tolist()
+    selected_specialists = ["Specialist", "ST-fysiker", "Nej"]
+    return selected_jobs, selected_depts, selected_specialists
+
+@result_cache.memoize
+def initial_view(data, state):
+    """
+    Everything the callbacks would produce on a first page load, for prerendering the layout.
+
+    Returns:
+        dict: "selection" (checklist values), "options" (checklist options), "filter_state",
+        "figure" and "render_key" of the default tab.
+    """
+    filter_state = {"version": data.version, "state": state, "rows": len(get_filtered_data(data.engine, state))}
+    render_key = {"tab": DEFAULT_TAB, "color_by": DEFAULT_COLOR_BY, "version": data.version}
+    return {
+        "selection": default_selection(data),
+        "options": update_filter_options(data.cube, state),
+        "filter_state": filter_state,
+        "figure": render_graph(data, state, DEFAULT_TAB, DEFAULT_COLOR_BY, False),
+        "render_key": render_key,
+    }
+
+def prerender_initial_view(data):
+    """`initial_view` for the default filter state of a dataset (computed once per version)."""
+    state = filter_state_key(*default_selection(data), DEFAULT_EXP_RANGE)
+    return initial_view(data, state)
+
+def render_tab(data, state, selected_tab, color_by, current_render_key):
+    """
+    Outputs of `update_graph` for the active tab: figure (or Patch), graph style, statistics
+    content and the new render key.
+    """
+    graph_style = {"width": "100%", "height": "100%"}
+    hidden_style = {"display": "none"}
+
+    if selected_tab == "statistics":
+        with metrics.phase("stats"):
+            stats_table = update_statistics_table(data.salary_stats, state, color_by)
+
+        # Leave the hidden figure alone, it can still be patched when its tab is shown again
+        return no_update, hidden_style, stats_table, no_update
+
+    # The figure in the browser can be patched if it was built for the same tab, grouping and data
+    render_key = {"tab": selected_tab, "color_by": color_by, "version": data.version}
+    incremental = render_key == current_render_key
+
+    with metrics.phase("figure"):
+        fig = render_graph(data, state, selected_tab, color_by, incremental)
+    if fig is None:
+        message = html.Div([html.H4("No data available for the selected filters.", style={"text-align": "center", "margin-top": "20px"})])
+        return no_update, hidden_style, message, no_update
+
+    return fig, graph_style, None, render_key
+
+def speculative_render(data, state, tab, color_by, render_key):
+    """Cache what `update_graph` will need if the visitor switches to `tab` (see `speculative.py`)."""
+    if tab == "statistics":
+        update_statistics_table(data.salary_stats, state, color_by)
+    else:
+        incremental = render_key == {"tab": tab, "color_by": color_by, "version": data.version}
+        render_graph(data, state, tab, color_by, incremental)
+
+def register_callbacks(app, dataset_manager, speculative_renderer=None):
+    # Every callback takes the current DashboardData (row index, facet cube, statistics) once and
+    # uses only that bundle, so a dataset reload never mixes old and new data within a request
+    if speculative_renderer is None:
+        speculative_renderer = SpeculativeRenderer(max_workers=0)  # Speculation disabled
+
+    # Stage 1: filter. Publishes the dataset version and canonical filter state; the selected row
+    # positions stay in the server-side cache under that key instead of travelling to the browser.
     @app.callback(
         [
-            Output("tab-content", "children"),  # Graph
-            Output("job-title-filter", "options"),
+            Output("filter-state", "data"),
             Output("job-title-filter", "value"),
-            Output("department-filter", "options"),
             Output("department-filter", "value"),
-            Output("specialist-filter", "options"),
             Output("specialist-filter", "value"),
         ],
         [
-            Input("tabs", "value"),
             Input("job-title-filter", "value"),
             Input("department-filter", "value"),
             Input("specialist-filter", "value"),
             Input("exp-slider", "value"),
-            Input("color-by-dropdown", "value"),
             Input("reset-filters", "n_clicks"),
-        ]
+        ],
+        prevent_initial_call=True,  # The default state is prerendered into the layout
     )
-    def update_graph(selected_tab, selected_jobs, selected_depts, selected_specialists, exp_range, color_by, reset_clicks):
-        # Apply filters
-        start_time = time.time()  # Start measuring time
-
+    @metrics.callback("filter_data")
+    def filter_data(selected_jobs, selected_depts, selected_specialists, exp_range, reset_clicks):
+        data = dataset_manager.current
         ctx = callback_context
         trigger_id = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
 
-        # First Load (No trigger detected) or Reset Button Clicked
+        # Reset Button Clicked (the first load is prerendered, see `initial_view`)
         if not ctx.triggered or trigger_id == "reset-filters":
-            selected_jobs = df["Job Title"].dropna().unique().tolist()
-            selected_depts = df["Department"].dropna().unique().tolist()
-            selected_specialists = ["Specialist", "ST-fysiker", "Nej"]
-            
-        dff = df.copy()
-        filtered_dff = get_filtered_data_wrapper(selected_jobs, selected_depts, selected_specialists, exp_range, df)
-
-        job_options, dept_options, specialist_options = update_filter_options(filtered_dff, df)
-
-        filtering_done_time = time.time()
-            
-        # Generate the correct graph based on the selected tab
-        if selected_tab == "histogram":
-            if filtered_dff.empty:
-                return html.Div([html.H4("No data available for the selected filters.", style={"text-align": "center", "margin-top": "20px"})])
-            else:
-                fig = px.histogram(filtered_dff, x="Månadslön totalt", nbins=20,
-                                labels={"Månadslön totalt": "Total Monthly Salary"},
-                                marginal="box", opacity=0.7)
-                fig.update_layout(bargap=0.1)
-        elif selected_tab == "statistics":
-            # Create table rows as a list
-            table_rows = [
-                html.Tr([
-                    html.Td("Number of entries", style={"text-align": "right"}),
-                    html.Td(f"{len(df)}", style={"text-align": "right"}),
-                    html.Td(f"{len(filtered_dff)}", style={"text-align": "right"})
-                ]),
-                html.Tr([
-                    html.Td("25th percentile salary", style={"text-align": "right"}),
-                    html.Td(f"{df['Månadslön totalt'].quantile(0.25):,.0f}", style={"text-align": "right"}),
-                    html.Td(f"{filtered_dff['Månadslön totalt'].quantile(0.25):,.0f}", style={"text-align": "right"})
-                ]),
-                html.Tr([
-                    html.Td("Median salary", style={"text-align": "right", "border-bottom": "2px solid black", "border-top": "2px solid black"}),
-                    html.Td(f"{df['Månadslön totalt'].median():,.0f}", style={"text-align": "right", "border-bottom": "2px solid black", "border-top": "2px solid black"}),
-                    html.Td(f"{filtered_dff['Månadslön totalt'].median():,.0f}", style={"text-align": "right", "border-bottom": "2px solid black", "border-top": "2px solid black"})
-                ]),
-                html.Tr([
-                    html.Td("Average salary", style={"text-align": "right"}),
-                    html.Td(f"{df['Månadslön totalt'].mean():,.0f}", style={"text-align": "right"}),
-                    html.Td(f"{filtered_dff['Månadslön totalt'].mean():,.0f}", style={"text-align": "right"})
-                ]),
-                html.Tr([
-                    html.Td("75th percentile salary", style={"text-align": "right"}),
-                    html.Td(f"{df['Månadslön totalt'].quantile(0.75):,.0f}", style={"text-align": "right"}),
-                    html.Td(f"{filtered_dff['Månadslön totalt'].quantile(0.75):,.0f}", style={"text-align": "right"})
-                ]),
-                html.Tr([
-                    html.Td("Average experience (years)", style={"text-align": "right"}),
-                    html.Td(f"{df['ExperienceYears'].mean():.1f}", style={"text-align": "right"}),
-                    html.Td(f"{filtered_dff['ExperienceYears'].mean():.1f}", style={"text-align": "right"})
-                ])
-            ]
-
-            # Create the table
-            stats_table = html.Div(
-                dbc.Table(
-                    [
-                        html.Thead(html.Tr([
-                            html.Th("Metric", style={"text-align": "right", "min-width": "150px", "white-space": "nowrap"}),  
-                            html.Th("Full Set", style={"text-align": "right", "min-width": "120px", "white-space": "nowrap"}),  
-                            html.Th("Filtered Set", style={"text-align": "right", "min-width": "120px", "white-space": "nowrap"})
-                        ])),
-                        html.Tbody(table_rows)
-                    ],
-                    bordered=True,
-                    striped=True,
-                    hover=True,
-                    className="mb-4",
-                    style={"width": "auto"}
-                ),
-                style={"display": "flex", "justify-content": "center", "margin-top": "40px"}
-            )
-
-
-            return stats_table, job_options, selected_jobs, dept_options, selected_depts, specialist_options, selected_specialists
-        elif selected_tab == "scatterplot2":
-            
-            # Unique row identifier for filtering
-            dff['row_id'] = dff[['Job Title', 'Department', 'ExperienceYears', 'Månadslön totalt']].astype(str).agg('_'.join, axis=1)
-            filtered_dff['row_id'] = filtered_dff[['Job Title', 'Department', 'ExperienceYears', 'Månadslön totalt']].astype(str).agg('_'.join, axis=1)
-
-            # Determine which rows are in the filtered DataFrame
-            filtered_set = set(filtered_dff['row_id'])  # Convert to set for faster lookup
-            dff['is_filtered'] = dff['row_id'].apply(lambda x: x in filtered_set)
-
-            # Split data into two groups
-            filtered_points = dff[dff['is_filtered']]
-            unfiltered_points = dff[~dff['is_filtered']]
-            
-            all_categories = dff[color_by].unique()
-            visible_categories = filtered_dff[color_by].unique()
-
-            # Create traces for filtered and unfiltered points
-            # Loop through each category and create separate traces
-            filtered_traces = []
-            unfiltered_traces = []
-            trend_traces = []
-            for idx, category in enumerate(all_categories):
-                category_df = dff[dff[color_by] == category]
-                filtered_points = category_df[category_df['is_filtered']]
-                unfiltered_points = category_df[~category_df['is_filtered']]
-                category_visible = category in visible_categories
-
-                # Get color based on index, cycle if more than 5 categories
-                color_name = idx_to_color[idx % len(idx_to_color)]
-                base_color = color_variants[color_name]
-
-                # Filtered (highlighted) points
-                filtered_trace = go.Scattergl(
-                    x=filtered_points['ExperienceYears'],
-                    y=filtered_points['Månadslön totalt'],
-                    mode='markers',
-                    marker=dict(size=20, color=base_color['opaque'], line=dict(width=1, color="white")),
-                    name=category,
-                    showlegend=category_visible,
-                    hoverinfo="skip",
-                )
-                filtered_traces.append(filtered_trace)
-                
-
-                
-                # Unfiltered (faded) points
-                unfiltered_trace = go.Scattergl(
-                    x=unfiltered_points['ExperienceYears'],
-                    y=unfiltered_points['Månadslön totalt'],
-                    mode='markers',
-                    marker=dict(size=15, color=base_color['faded']),
-                    name=category,
-                    showlegend=not category_visible,
-                    hoverinfo="skip"
-                )
-                unfiltered_traces.append(unfiltered_trace)
-
-                # Trend trace
-                group_df = filtered_dff[filtered_dff[color_by] == category]  
-                if not group_df.empty:  # Ensure the group has data
-                    # Find the index of the category in all_categories
-                    trend_color = base_color["darker"]
-
-                    trend_data = compute_trendline(group_df["ExperienceYears"], group_df["Månadslön totalt"])
-                    if trend_data:
-                        trend_x, trend_y = trend_data
-                        trend_trace = go.Scattergl(
-                            x=trend_x, y=trend_y, mode="lines",
-                            line=dict(color=trend_color, width=2),
-                            showlegend=False,
-                            hoverinfo="skip"  # Hide from legend
-                        )
-                        trend_traces.append(trend_trace)
-                        
-
-            fig = go.Figure()
-            for trace in unfiltered_traces:
-                fig.add_trace(trace)  # Background points first
-            for trace in filtered_traces:
-                fig.add_trace(trace)  # Highlighted points on top
-
-            # **Add general trend line for all data (black)**
-            if not filtered_dff.empty:
-                trend_data = compute_trendline(filtered_dff["ExperienceYears"], filtered_dff["Månadslön totalt"])
-                if trend_data:
-                    trend_x, trend_y = trend_data
-                    fig.add_trace(go.Scattergl(
-                        x=trend_x, y=trend_y, mode="lines",
-                        line=dict(color="black", width=2),
-                        name="Trend line",
-                        showlegend=True,
-                        hoverinfo="skip"
-                    ))
-
-            for trend_trace in trend_traces:
-                trend_trace.showlegend = False  # Hide from legend
-                fig.add_trace(trend_trace)
-
-            fig.update_layout(
-                xaxis_title="Experience (years)",
-                yaxis_title="Monthly Salary",
-                # hovermode="closest"
-                legend=dict(
-                    font=dict(size=16)  # Adjust size as needed
-                )
-            )
-
-        all_done_time = time.time()
-        filtering_done = round(filtering_done_time - start_time, 4)  # Measure execution time
-        graph_time = round(all_done_time - filtering_done_time, 4)  # Measure execution time
-        everything_done = filtering_done + graph_time
-
-        debug_info = (
-            f"Time to Filter: {filtering_done}s | "
-            f"Time to Generate Graph: {graph_time}s | "
-            f"Total Time: {everything_done}s"
-        )
+            selected_jobs, selected_depts, selected_specialists = default_selection(data)
 
-        print(f"Timing Info: {debug_info}")  # Logs to backend console
+        with metrics.phase("filter"):
+            state, rows = get_filtered_data_wrapper(selected_jobs, selected_depts, selected_specialists, exp_range, data.engine)
 
+        filter_state = {"version": data.version, "state": state, "rows": len(rows)}
+        return filter_state, selected_jobs, selected_depts, selected_specialists
 
-        return dcc.Graph(figure=fig, style={"width": "100%", "height": "100%"}), job_options, selected_jobs, dept_options, selected_depts, specialist_options, selected_specialists
-    
-        # return (
-        #     html.Div([
-        #         dcc.Graph(figure=fig, style={"width": "100%", "height": "100%"}),
-        #         html.P(debug_info, style={"margin-top": "10px", "font-size": "14px", "color": "gray"})
-        #     ])
-        # ), job_options, selected_jobs, dept_options, selected_depts, specialist_options, selected_specialists
-
+    # Stage 2: checklist counts, only when the filter state changes
+    @app.callback(
+        [
+            Output("job-title-filter", "options"),
+            Output("department-filter", "options"),
+            Output("specialist-filter", "options"),
+        ],
+        Input("filter-state", "data"),
+        prevent_initial_call=True,
+    )
+    @metrics.callback("update_facet_counts")
+    def update_facet_counts(filter_state):
+        if not filter_state:
+            raise PreventUpdate
+        data = dataset_manager.current
+        with metrics.phase("facet_counts"):
+            return update_filter_options(data.cube, filter_state_key(*filter_state["state"]))
+
+    # Stage 3: render the active tab. Tab and color-by changes start here and skip all filter work.
+    @app.callback(
+        [
+            Output("tab-graph", "figure"),  # Graph (full figure or Patch)
+            Output("tab-graph", "style"),
+            Output("stats-content", "children"),
+            Output("graph-render-key", "data"),
+        ],
+        [
+            Input("filter-state", "data"),
+            Input("tabs", "value"),
+            Input("color-by-dropdown", "value"),
+        ],
+        [
+            State("graph-render-key", "data"),
+            State("session-id", "data"),
+        ],
+        prevent_initial_call=True,
+    )
+    @metrics.callback("update_graph")
+    def update_graph(filter_state, selected_tab, color_by, current_render_key, session_id):
+        if not filter_state:
+            raise PreventUpdate
+        data = dataset_manager.current
+        state = filter_state_key(*filter_state["state"])
+
+        metrics.label_payload(f"update_graph/{selected_tab}")
+        with speculative_renderer.foreground():
+            response = render_tab(data, state, selected_tab, color_by, current_render_key)
+
+        # Render the other tabs for the same state in the background, the way a tab switch would ask for them
+        next_render_key = response[3] if response[3] is not no_update else current_render_key
+        speculative_renderer.submit(session_id, [
+            partial(speculative_render, data, state, tab, color_by, next_render_key)
+            for tab in TABS if tab != selected_tab
+        ])
+        return response
@@ -43,6 +43,7 @@ for name, hex_color in base_colors.items():
         'darker': darker
     }
 
-# Example output:
-for color, variants in color_variants.items():
-    print(f"{color}: {variants}")
\ No newline at end of file
+if __name__ == "__main__":
+    # Example output:
+    for color, variants in color_variants.items():
+        print(f"{color}: {variants}")
@@ -0,0 +1,82 @@
+"""
+gzip/brotli compression of the Flask server's responses.
+
+Callback responses and the page layout are compressed with the best encoding the browser
+accepts: brotli if the optional `brotli` package is installed, else gzip. Small, streamed and
+file responses (Dash's JavaScript bundles) are sent as they are.
+"""
+import gzip
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+COMPRESS_MIN_BYTES = 500  # Smaller bodies gain less than the header costs
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Per-request compression; the highest qualities are too slow for that
+
+
+def accepted_encodings(accept_encoding):
+    """Encodings in an Accept-Encoding header that the client did not refuse with q=0."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            refused = params and float(quality) == 0
+        except ValueError:
+            refused = False
+        if name and not refused:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """"br", "gzip" or None for a request's Accept-Encoding header."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def init_compression(app):
+    """
+    Compress responses of the Flask server behind `app`.
+
+    Call after `init_metrics`: Flask runs the response hooks in reverse order, so the metrics hook
+    sees the compressed body and takes the uncompressed size from `g.uncompressed_bytes`.
+    """
+    server = app.server
+
+    @server.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        body = response.get_data()
+        if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+            return response
+
+        g.uncompressed_bytes = len(body)
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -1,3 +1,191 @@
+"""
+Streaming ingestion of the salary survey xlsx export into a CSV file or a snapshot directory.
+
+Rows are streamed from every sheet with openpyxl in read-only mode and handled in fixed-size
+chunks: each chunk is validated (whole-number experience and salary), normalized with
+`dataset.prepare_frame` (column renames, "Not Specified"/"Nej" fills) and written out before the
+next one is read, so peak memory depends on the chunk size rather than on the workbook size.
+Sheets without the required columns (e.g. notes) are skipped.
+
+Usage:
+    python convert_to_csv.py [salary_data.xlsx] [--output salary_data.csv] [--format csv|snapshot]
+        [--chunk-size 10000] [--sheets "2023,2024"]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import openpyxl
 import pandas as pd
-df = pd.read_excel("salary_data.xlsx")
-df.to_csv("salary_data.csv", index=False)
+
+from dataset import COLUMN_RENAMES, FILL_VALUES, SnapshotWriter, prepare_frame
+
+DEFAULT_XLSX_PATH = "salary_data.xlsx"
+DEFAULT_CHUNK_SIZE = 10_000
+# Source columns every sheet needs; the two numeric ones must hold whole numbers
+REQUIRED_COLUMNS = tuple(COLUMN_RENAMES) + tuple(column for column in FILL_VALUES if column not in COLUMN_RENAMES.values())
+WHOLE_NUMBER_COLUMNS = ("Antal hela år med arbete i klinisk verksamhet", "Månadslön totalt")
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, sheets=None):
+    """
+    Stream the rows of a workbook as dataframes of at most `chunk_size` rows.
+
+    Args:
+        path (str): xlsx file.
+        chunk_size (int): Rows per chunk.
+        sheets (set[str] | None): Sheet names to read, None for all.
+
+    Yields:
+        tuple: (sheet name, chunk) with the sheet's header as columns; blank rows are skipped.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            if sheets is not None and sheet.title not in sheets:
+                continue
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            # Read-only mode pads rows to the sheet width; keep the columns that have a header
+            named = [i for i, name in enumerate(header) if name is not None]
+            columns = [str(header[i]) for i in named]
+            missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+            if missing:
+                print(f"⚠️ WARNING: skipping sheet {sheet.title!r}, missing columns {missing}")
+                continue
+
+            chunk = []
+            for row in rows:
+                values = [row[i] if i < len(row) else None for i in named]
+                if all(value is None for value in values):
+                    continue
+                chunk.append(values)
+                if len(chunk) == chunk_size:
+                    yield sheet.title, pd.DataFrame(chunk, columns=columns)
+                    chunk = []
+            if chunk:
+                yield sheet.title, pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def normalize_chunk(chunk, columns):
+    """
+    Validate and normalize one chunk of raw rows.
+
+    Rows whose experience or total salary is missing or not a whole number are dropped. Other
+    whole-number columns are written without a decimal point whatever the chunk's dtype, so the
+    output does not depend on how rows were split into chunks.
+
+    Args:
+        chunk (pd.DataFrame): Raw rows with source column names.
+        columns (list[str]): Output columns (source names) in order; others are dropped.
+
+    Returns:
+        tuple: (prepared dataframe, number of dropped rows).
+    """
+    chunk = chunk.reindex(columns=columns)
+    valid = np.ones(len(chunk), dtype=bool)
+    for column in WHOLE_NUMBER_COLUMNS:
+        values = pd.to_numeric(chunk[column], errors="coerce")
+        valid &= values.notna().to_numpy() & (values == values.round()).to_numpy()
+        chunk[column] = values
+    chunk = chunk[valid].copy()
+    for column in WHOLE_NUMBER_COLUMNS:
+        chunk[column] = chunk[column].astype(np.int64)
+
+    for column in chunk.columns:
+        values = chunk[column]
+        if values.dtype == float and (values.dropna() == values.dropna().round()).all():
+            chunk[column] = values.astype("Int64")
+    return prepare_frame(chunk), int((~valid).sum())
+
+
+class CsvWriter:
+    """Appends prepared chunks to a CSV file that is moved into place when closed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp-{os.getpid()}"
+        self._file = open(self.tmp_path, "w", encoding="utf-8", newline="")
+        self._header = True
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+    def append(self, df):
+        df.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self.rows += len(df)
+
+
+def _peak_memory_mb():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def ingest(source, output, output_format="csv", chunk_size=DEFAULT_CHUNK_SIZE, sheets=None):
+    """
+    Stream a workbook into a CSV file or a snapshot directory.
+
+    Returns:
+        dict: "rows" written, "dropped" rows, "seconds" and "rows_per_second".
+    """
+    start_time = time.time()
+    writer = SnapshotWriter(output) if output_format == "snapshot" else CsvWriter(output)
+    columns = None
+    dropped = 0
+    with writer:
+        for sheet, chunk in iter_chunks(source, chunk_size, sheets):
+            if columns is None:
+                columns = list(chunk.columns)  # The first sheet decides the output columns
+            prepared, n_dropped = normalize_chunk(chunk, columns)
+            writer.append(prepared)
+            dropped += n_dropped
+            elapsed = time.time() - start_time
+            print(f"\t{sheet}: {writer.rows} rows ({writer.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    seconds = time.time() - start_time
+    return {
+        "rows": writer.rows,
+        "dropped": dropped,
+        "seconds": seconds,
+        "rows_per_second": writer.rows / max(seconds, 1e-9),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default=DEFAULT_XLSX_PATH)
+    parser.add_argument("--output", help="output path (default: salary_data.csv or salary_data.snapshot)")
+    parser.add_argument("--format", choices=("csv", "snapshot"), default="csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--sheets", help="comma-separated sheet names (default: all sheets)")
+    args = parser.parse_args()
+
+    output = args.output or ("salary_data.snapshot" if args.format == "snapshot" else "salary_data.csv")
+    sheets = set(args.sheets.split(",")) if args.sheets else None
+    report = ingest(args.source, output, args.format, args.chunk_size, sheets)
+
+    peak = _peak_memory_mb()
+    print(
+        f"Wrote {report['rows']} rows to {output} in {report['seconds']:.2f}s "
+        f"({report['rows_per_second']:,.0f} rows/s), dropped {report['dropped']} invalid rows"
+        + (f", peak memory {peak:.0f} MB" if peak is not None else "")
+    )
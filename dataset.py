@@ -0,0 +1,399 @@
+"""
+Loading of the salary dataset.
+
+The source CSV/xlsx uses Swedish column names and object dtypes. `build_snapshot` turns it into a
+compact columnar snapshot directory (categorical codes + int32 columns stored as .npy files) that
+`load_dataset` memory-maps at startup, so workers skip the CSV parse and share one physical copy
+of the data through the page cache.
+
+Usage:
+    python dataset.py [source.csv|source.xlsx] [snapshot_dir]
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from facet_cube import FacetCube
+from filter_engine import FilterEngine
+from statistics_module import SalaryStatistics, TrendlineModel
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process snapshot lock
+    fcntl = None
+
+logger = logging.getLogger("salary_dashboard")
+
+DEFAULT_CSV_PATH = "salary_data.csv"
+DEFAULT_SNAPSHOT_PATH = "salary_data.snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Rename columns to English-friendly names
+COLUMN_RENAMES = {
+    "Befattning": "Job Title",
+    "Arbetsplats": "Department",
+    "Antal hela år med arbete i klinisk verksamhet": "ExperienceYears",
+    "Månadslön totalt": "Månadslön totalt"
+}
+
+# Values used for missing categories
+FILL_VALUES = {
+    "Job Title": "Not Specified",
+    "Department": "Not Specified",
+    "Specialist eller ST-fysiker": "Nej",
+}
+
+# Columns stored in the snapshot (everything the dashboard reads)
+CATEGORY_COLUMNS = ("Job Title", "Department", "Specialist eller ST-fysiker")
+INT_COLUMNS = ("ExperienceYears", "Månadslön totalt")
+
+
+def prepare_frame(df):
+    """Apply the column renames and missing-value fills the dashboard expects (in place)."""
+    df.rename(columns=COLUMN_RENAMES, inplace=True)
+    for column, fill_value in FILL_VALUES.items():
+        df[column] = df[column].fillna(fill_value)
+    return df
+
+
+def read_source(path):
+    """Read a raw CSV or xlsx export and prepare it."""
+    if path.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    return prepare_frame(df)
+
+
+def _codes_dtype(n_categories):
+    return np.int8 if n_categories < 2**7 else np.int16 if n_categories < 2**15 else np.int32
+
+
+class SnapshotWriter:
+    """
+    Incremental writer of a snapshot directory, one prepared dataframe chunk at a time.
+
+    Column values are appended to raw files in a temporary directory next to the target, so only
+    the current chunk is held in memory. Category codes are assigned in order of appearance while
+    appending and remapped to the sorted categories (the order `pd.Categorical` uses) when the
+    snapshot is closed; the directory is then renamed into place, so readers never see a
+    half-written snapshot.
+
+    Usage:
+        with SnapshotWriter(path) as writer:
+            for chunk in chunks:
+                writer.append(chunk)
+    """
+
+    BLOCK_ROWS = 1 << 20  # Rows per read when converting the raw files to .npy
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self.tmp_path = f"{snapshot_path}.tmp-{os.getpid()}"
+        self.rows = 0
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._categories = {column: {} for column in CATEGORY_COLUMNS}  # value -> code, in order of appearance
+        self._raw_files = {
+            column: open(os.path.join(self.tmp_path, f"{i}.raw"), "wb")
+            for i, column in enumerate(CATEGORY_COLUMNS + INT_COLUMNS)
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.abort()
+            return
+        try:
+            self.close()
+        except BaseException:
+            self.abort()
+            raise
+
+    def append(self, df):
+        """Append a prepared chunk (see `prepare_frame`)."""
+        for column in CATEGORY_COLUMNS:
+            mapping = self._categories[column]
+            codes, uniques = pd.factorize(df[column])
+            # Chunk codes -> snapshot codes; the appended -1 keeps missing values (code -1) missing
+            lookup = np.array([mapping.setdefault(value, len(mapping)) for value in uniques] + [-1], dtype=np.int32)
+            lookup[codes].tofile(self._raw_files[column])
+        for column in INT_COLUMNS:
+            values = df[column].to_numpy()
+            if pd.isna(values).any():
+                raise ValueError(f"Column {column!r} has missing values and cannot be stored as int32")
+            if (values.astype(np.int32) != values).any():
+                raise ValueError(f"Column {column!r} does not fit in int32")
+            values.astype(np.int32).tofile(self._raw_files[column])
+        self.rows += len(df)
+
+    def close(self):
+        """Convert the raw files to .npy, write meta.json and move the snapshot into place."""
+        meta = {"format": SNAPSHOT_FORMAT_VERSION, "rows": self.rows, "columns": []}
+        for i, column in enumerate(CATEGORY_COLUMNS + INT_COLUMNS):
+            self._raw_files[column].close()
+            file_name = f"{i}.npy"
+            if column in CATEGORY_COLUMNS:
+                categories = sorted(self._categories[column])
+                positions = {value: position for position, value in enumerate(categories)}
+                remap = np.array([positions[value] for value in self._categories[column]] + [-1], dtype=np.int32)
+                dtype = _codes_dtype(len(categories))
+                meta["columns"].append({"name": column, "file": file_name, "kind": "category", "categories": categories})
+            else:
+                remap = None
+                dtype = np.dtype(np.int32)
+                meta["columns"].append({"name": column, "file": file_name, "kind": "int32"})
+            self._raw_to_npy(os.path.join(self.tmp_path, f"{i}.raw"), os.path.join(self.tmp_path, file_name), remap, dtype)
+
+        with open(os.path.join(self.tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+        shutil.rmtree(self.snapshot_path, ignore_errors=True)
+        os.rename(self.tmp_path, self.snapshot_path)
+
+    def abort(self):
+        """Discard everything written so far (also after a failed `close`)."""
+        for f in self._raw_files.values():
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+    def _raw_to_npy(self, raw_path, npy_path, remap, dtype):
+        with open(raw_path, "rb") as raw, open(npy_path, "wb") as npy:
+            header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": (self.rows,)}
+            np.lib.format.write_array_header_1_0(npy, header)
+            while True:
+                block = np.fromfile(raw, dtype=np.int32, count=self.BLOCK_ROWS)
+                if len(block) == 0:
+                    break
+                (remap[block] if remap is not None else block).astype(dtype).tofile(npy)
+        os.remove(raw_path)
+
+
+def write_snapshot(df, snapshot_path):
+    """
+    Write a prepared dataframe as a snapshot directory.
+
+    Every column becomes one .npy file next to a meta.json describing categories and dtypes (see
+    `SnapshotWriter`).
+    """
+    with SnapshotWriter(snapshot_path) as writer:
+        writer.append(df)
+
+
+def load_snapshot(snapshot_path):
+    """Memory-map a snapshot directory into a dataframe without copying the column data."""
+    with open(os.path.join(snapshot_path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {meta.get('format')!r} in {snapshot_path}")
+
+    columns = {}
+    for column in meta["columns"]:
+        values = np.load(os.path.join(snapshot_path, column["file"]), mmap_mode="r")
+        if column["kind"] == "category":
+            columns[column["name"]] = pd.Categorical.from_codes(values, categories=column["categories"])
+        else:
+            columns[column["name"]] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def build_snapshot(source_path=DEFAULT_CSV_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """Ingest a raw CSV/xlsx export into a snapshot directory."""
+    write_snapshot(read_source(source_path), snapshot_path)
+
+
+@contextmanager
+def snapshot_lock(snapshot_path):
+    """
+    Exclusive lock on `<snapshot>.lock` across processes, held while a snapshot is rebuilt.
+
+    Without `fcntl` (Windows, a single development server) there is nothing to serialize with.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{snapshot_path}.lock", "a", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _snapshot_is_stale(csv_path, snapshot_path):
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(snapshot_path)
+
+
+class DashboardData:
+    """A prepared dataframe plus every index the callbacks derive from it, built once per version."""
+
+    def __init__(self, df):
+        self.df = df
+        self.engine = FilterEngine(df)
+        self.version = self.engine.version
+        self.cube = FacetCube(self.engine)
+        self.salary_stats = SalaryStatistics(self.cube, df)
+        self.trend_model = TrendlineModel(self.cube, df)
+
+    def __repr__(self):
+        return f"DashboardData(version={self.version}, rows={len(self.df)})"
+
+
+def load_dataset(csv_path=DEFAULT_CSV_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Load the dashboard dataframe, preferring the memory-mapped snapshot.
+
+    A snapshot older than the CSV is rebuilt from the CSV first, so an updated export takes
+    effect on the next (re)load. Workers that notice the change at the same time queue on
+    `snapshot_lock`: the first one rebuilds, the others find the snapshot fresh and load it. If
+    the snapshot cannot be rebuilt or read, the CSV is read directly.
+
+    Returns:
+        pd.DataFrame | None: Prepared dataframe, or None if neither snapshot nor CSV exists.
+    """
+    if os.path.isdir(snapshot_path):
+        try:
+            if _snapshot_is_stale(csv_path, snapshot_path):
+                with snapshot_lock(snapshot_path):
+                    if _snapshot_is_stale(csv_path, snapshot_path):  # Not rebuilt while waiting for the lock
+                        logger.info("%s is newer than %s, rebuilding the snapshot", csv_path, snapshot_path)
+                        build_snapshot(csv_path, snapshot_path)
+                    return load_snapshot(snapshot_path)
+            return load_snapshot(snapshot_path)
+        except OSError:  # Read-only deployment, or the snapshot was replaced while being read
+            logger.warning("Could not use %s, reading %s instead", snapshot_path, csv_path, exc_info=True)
+    if os.path.exists(csv_path):
+        return read_source(csv_path)
+    logger.error("Neither %s nor %s exists", snapshot_path, csv_path)
+    return None
+
+
+class DatasetManager:
+    """
+    Owns the current `DashboardData` and replaces it when the dataset changes, without a restart.
+
+    A reload reads the source again and builds all indexes in the calling (background) thread
+    while requests keep using the current bundle; the new bundle is then swapped in with a single
+    reference assignment. Callbacks read `manager.current` once per request, so a request sees
+    either the old or the new data but never a mix. Cached results are keyed on the dataset
+    version, so entries of the old version are simply never asked for again (`on_swap` can drop
+    them right away).
+
+    The watcher polls the modification times of the snapshot, the CSV and a reload marker file;
+    touching the marker (see `request_reload`) makes every worker reload on its next poll. A CSV
+    newer than the snapshot is ingested into a new snapshot on reload (see `load_dataset`).
+    """
+
+    def __init__(self, csv_path=DEFAULT_CSV_PATH, snapshot_path=DEFAULT_SNAPSHOT_PATH, on_swap=None):
+        self.csv_path = csv_path
+        self.snapshot_path = snapshot_path
+        self.marker_path = f"{snapshot_path}.reload"
+        self.on_swap = on_swap  # Called as on_swap(old, new) after a swap
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self.current = DashboardData(self._load())
+
+    def __repr__(self):
+        return f"DatasetManager(current={self.current!r})"
+
+    def _source_mtimes(self):
+        paths = (os.path.join(self.snapshot_path, "meta.json"), self.csv_path, self.marker_path)
+        return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in paths)
+
+    def _load(self):
+        """Load the dataset and record the source modification times it reflects."""
+        before = self._source_mtimes()
+        df = load_dataset(self.csv_path, self.snapshot_path)
+        if df is None:
+            raise FileNotFoundError(f"Neither {self.snapshot_path} nor {self.csv_path} exists")
+        after = self._source_mtimes()
+        # A snapshot rebuilt from the CSV by this load is not a new change; anything else that
+        # changed while loading is left for the watcher to pick up
+        self._loaded_mtimes = after if after[1:] == before[1:] else before
+        return df
+
+    def reload(self):
+        """
+        Load the dataset again and swap in its indexes if the data changed.
+
+        Returns:
+            bool: True if a new version was swapped in.
+        """
+        with self._reload_lock:  # One rebuild at a time
+            new = DashboardData(self._load())
+            old = self.current
+            if new.version == old.version:
+                return False
+            self.current = new
+        logger.info("Dataset reloaded: %r -> %r", old, new)
+        if self.on_swap is not None:
+            self.on_swap(old, new)
+        return True
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Dataset reload failed, keeping %r", self.current)
+
+    def reload_in_background(self):
+        """Start a reload in a background thread and return the thread."""
+        thread = threading.Thread(target=self._reload_logged, name="dataset-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def request_reload(self):
+        """Reload in this process now and signal the other workers through the marker file."""
+        with open(self.marker_path, "a", encoding="utf-8"):
+            os.utime(self.marker_path)
+        return self.reload_in_background()
+
+    def start_watching(self, interval):
+        """
+        Poll the sources every `interval` seconds (0 disables) and reload after a change.
+
+        A change is only picked up once the modification times are the same on two polls in a
+        row, so a CSV that is still being copied is not read half-written. Threads do not survive
+        a fork: under gunicorn this is called in every worker (see gunicorn.conf.py).
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            pending = None
+            while not self._stop.wait(interval):
+                mtimes = self._source_mtimes()
+                if mtimes == self._loaded_mtimes:
+                    pending = None
+                elif mtimes == pending:
+                    self._reload_logged()
+                    pending = None
+                else:
+                    pending = mtimes
+
+        self._watcher = threading.Thread(target=watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SNAPSHOT_PATH
+    start_time = time.time()
+    with snapshot_lock(target):
+        build_snapshot(source, target)
+    print(f"Wrote {target} from {source} in {time.time() - start_time:.2f}s")
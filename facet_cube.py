@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from filter_engine import FACET_COLUMNS, EXPERIENCE_COLUMN
+
+
+class FacetCube:
+    """
+    Row counts per job × department × specialist × experience-year cell.
+
+    Built once per dataset version. Checklist counts for any filter state come from slicing and
+    summing this (small) cube, so their cost depends on the number of category cells rather than
+    on the number of rows. The sorted label lists for the checklists are built here once as well.
+    """
+
+    def __init__(self, engine):
+        df = engine.df
+        self.version = engine.version
+
+        # Axis labels are the sorted checklist values; cells are addressed by position along each axis
+        self.labels = {}
+        self.positions = {}
+        axis_codes = []
+        for column in FACET_COLUMNS:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self.labels[column] = list(uniques)
+            self.positions[column] = {value: i for i, value in enumerate(self.labels[column])}
+            axis_codes.append(codes)
+
+        # Experience axis: one slot per whole year between min and max
+        experience = df[EXPERIENCE_COLUMN].to_numpy(dtype=float)
+        if len(experience) and not np.array_equal(experience, np.round(experience)):
+            raise ValueError(f"{EXPERIENCE_COLUMN} must hold whole years to build a facet cube")
+        self.exp_min = int(experience.min()) if len(experience) else 0
+        exp_max = int(experience.max()) if len(experience) else 0
+        axis_codes.append(experience.astype(np.int64) - self.exp_min)
+
+        self.shape = tuple(len(self.labels[column]) for column in FACET_COLUMNS) + (exp_max - self.exp_min + 1,)
+        # Cell of every row; rows with a missing facet value (code -1) get cell -1 and are never counted
+        valid = np.logical_and.reduce([codes >= 0 for codes in axis_codes[:-1]])
+        self.row_cells = np.full(len(df), -1, dtype=np.int64)
+        self.row_cells[valid] = np.ravel_multi_index([codes[valid] for codes in axis_codes], self.shape)
+        self.counts = np.bincount(self.row_cells[valid], minlength=int(np.prod(self.shape))).reshape(self.shape)
+
+    def __repr__(self):
+        return f"FacetCube(version={self.version}, shape={self.shape})"
+
+    def axis_selection(self, state):
+        """Selected positions along each of the four axes for a canonical filter state."""
+        selection = []
+        for column, selected_values in zip(FACET_COLUMNS, state[:3]):
+            positions = self.positions[column]
+            selection.append(np.array(sorted(positions[value] for value in selected_values if value in positions), dtype=np.intp))
+        exp_range = state[3]
+        n_years = self.shape[-1]
+        if exp_range:
+            lo = max(exp_range[0] - self.exp_min, 0)
+            hi = min(exp_range[1] - self.exp_min, n_years - 1)
+            selection.append(np.arange(lo, hi + 1, dtype=np.intp))
+        else:
+            selection.append(np.arange(n_years, dtype=np.intp))
+        return selection
+
+    def cell_mask(self, state):
+        """
+        Flat boolean mask over all cells selected by a filter state.
+
+        One extra False entry is appended so that indexing with a row cell of -1 (missing facet
+        value) selects nothing: `cube.cell_mask(state)[cube.row_cells]` is the row mask.
+        """
+        masks = []
+        for axis, positions in enumerate(self.axis_selection(state)):
+            mask = np.zeros(self.shape[axis], dtype=bool)
+            mask[positions] = True
+            masks.append(mask)
+        cells = masks[0][:, None, None, None] & masks[1][None, :, None, None] & masks[2][None, None, :, None] & masks[3]
+        return np.append(cells.ravel(), False)
+
+    def facet_counts(self, state):
+        """
+        Number of filtered rows for every checklist value.
+
+        Args:
+            state (tuple): Canonical filter state (see `cache_config.filter_state_key`).
+
+        Returns:
+            dict: column -> {value: count} for each facet column, including zero counts.
+        """
+        selection = self.axis_selection(state)
+        sub = self.counts[np.ix_(*selection)]
+
+        result = {}
+        for axis, column in enumerate(FACET_COLUMNS):
+            counts = np.zeros(self.shape[axis], dtype=np.int64)
+            other_axes = tuple(a for a in range(sub.ndim) if a != axis)
+            counts[selection[axis]] = sub.sum(axis=other_axes)
+            result[column] = dict(zip(self.labels[column], counts.tolist()))
+        return result
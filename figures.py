@@ -0,0 +1,421 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+
+from serialization import compact_array
+
+# Above this many rows the scatter plot shows binned point density instead of every point
+SCATTER_MAX_POINTS = int(os.environ.get("SCATTER_MAX_POINTS", "20000"))
+DENSITY_SALARY_BINS = 50  # Rough number of salary buckets in the density view
+DENSITY_MAX_MARKER_PX = 30  # Diameter of the marker for the most populated density cell
+
+idx_to_color = {
+    0: "blue",
+    1: "red",
+    2: "green",
+    3: "purple",
+    4: "orange"
+}
+# color_variants = {
+#     'blue': {'opaque': 'rgba(31, 119, 180, 1.0)', 'faded': 'rgba(31, 119, 180, 0.2)', 'darker': 'rgba(24, 95, 144, 1.0)'},
+#     'red': {'opaque': 'rgba(214, 39, 40, 1.0)', 'faded': 'rgba(214, 39, 40, 0.2)', 'darker': 'rgba(171, 31, 31, 1.0)'},
+#     'green': {'opaque': 'rgba(44, 160, 44, 1.0)', 'faded': 'rgba(44, 160, 44, 0.2)', 'darker': 'rgba(35, 128, 35, 1.0)'},
+#     'purple': {'opaque': 'rgba(148, 103, 189, 1.0)', 'faded': 'rgba(148, 103, 189, 0.2)', 'darker': 'rgba(118, 70, 162, 1.0)'},
+#     'orange': {'opaque': 'rgba(255, 127, 14, 1.0)', 'faded': 'rgba(255, 127, 14, 0.2)', 'darker': 'rgba(215, 100, 0, 1.0)'}
+#     'cyan': 
+# }
+
+color_variants = {
+    'blue': {'opaque': 'rgba(99, 110, 250, 1.0)', 'faded': 'rgba(99, 110, 250, 0.2)', 'darker': 'rgba(79, 88, 200, 1.0)'},
+    'red': {'opaque': 'rgba(239, 85, 56, 1.0)', 'faded': 'rgba(239, 85, 56, 0.2)', 'darker': 'rgba(191, 68, 45, 1.0)'},
+    'green': {'opaque': 'rgba(0, 204, 150, 1.0)', 'faded': 'rgba(0, 204, 150, 0.2)', 'darker': 'rgba(0, 163, 120, 1.0)'},
+    'purple': {'opaque': 'rgba(171, 99, 250, 1.0)', 'faded': 'rgba(171, 99, 250, 0.2)', 'darker': 'rgba(137, 79, 200, 1.0)'},
+    'orange': {'opaque': 'rgba(255, 161, 90, 1.0)', 'faded': 'rgba(255, 161, 90, 0.2)', 'darker': 'rgba(204, 129, 72, 1.0)'},
+    'cyan': {'opaque': 'rgba(25, 211, 243, 1.0)', 'faded': 'rgba(25, 211, 243, 0.2)', 'darker': 'rgba(20, 169, 195, 1.0)'}
+}
+
+
+def category_color(idx):
+    """Color variants for the idx-th category, cycling if there are more than 5 categories."""
+    return color_variants[idx_to_color[idx % len(idx_to_color)]]
+
+
+def uses_density_view(engine):
+    """Whether the scatter plot for this dataset is drawn as binned density instead of points."""
+    return engine.n_rows > SCATTER_MAX_POINTS
+
+
+def _density_grid(engine):
+    """
+    Experience-year × salary bins of the density view for a dataset.
+
+    Returns:
+        tuple: (first experience year, first salary edge, salary bin size, n years, n salary bins).
+    """
+    x = engine.exp_sorted
+    y = engine.df["Månadslön totalt"].to_numpy()
+    exp_min, exp_max = int(x[0]), int(x[-1])
+    salary_min, salary_max = float(y.min()), float(y.max())
+    size = _nice_size((salary_max - salary_min) / DENSITY_SALARY_BINS) if salary_max > salary_min else 1.0
+    start = np.floor(salary_min / size) * size
+    return exp_min, start, size, exp_max - exp_min + 1, int((salary_max - start) // size) + 1
+
+
+def _density_groups(engine, rows, color_by):
+    """
+    Occupied density cells per category: cell centers plus the number of rows in each cell.
+
+    Args:
+        rows (np.ndarray | None): Positions of the rows to count, None for every row.
+
+    Returns:
+        list[dict]: Per category, "x", "y" and "marker.size" (row count) of its non-empty cells.
+    """
+    exp_min, start, size, n_years, n_bins = _density_grid(engine)
+    x = engine.df["ExperienceYears"].to_numpy()
+    y = engine.df["Månadslön totalt"].to_numpy()
+    codes = engine.codes[color_by]
+    k = len(engine.categories[color_by])
+    if rows is not None:
+        x, y, codes = x[rows], y[rows], codes[rows]
+
+    # Count rows per (category, year, salary bin) in one bincount; missing categories (-1) are dropped
+    keep = codes >= 0
+    n_cells = n_years * n_bins
+    salary_bin = np.minimum(((y[keep] - start) // size).astype(np.int64), n_bins - 1)
+    cells = (x[keep].astype(np.int64) - exp_min) * n_bins + salary_bin
+    counts = np.bincount(codes[keep] * n_cells + cells, minlength=k * n_cells).reshape(k, n_cells)
+
+    groups = []
+    for category_counts in counts:
+        occupied = np.flatnonzero(category_counts)
+        groups.append({
+            "x": exp_min + occupied // n_bins,
+            "y": start + (occupied % n_bins + 0.5) * size,
+            "marker": {"size": category_counts[occupied]},
+        })
+    return groups
+
+
+def _point_groups(engine, rows, color_by):
+    """Coordinates of the given rows per category, in dataframe order."""
+    x = engine.df["ExperienceYears"].to_numpy()
+    y = engine.df["Månadslön totalt"].to_numpy()
+    codes = engine.codes[color_by]
+    k = len(engine.categories[color_by])
+
+    # Group the rows by category in one stable sort (keeps the dataframe order)
+    row_codes = codes[rows]
+    order = rows[np.argsort(row_codes, kind="stable")]
+    n_missing = int((row_codes < 0).sum())  # Missing values (code -1) sort first
+    bounds = n_missing + np.concatenate(([0], np.cumsum(np.bincount(row_codes[row_codes >= 0], minlength=k))))
+    return [
+        {"x": x[order[bounds[idx]:bounds[idx + 1]]], "y": y[order[bounds[idx]:bounds[idx + 1]]]}
+        for idx in range(k)
+    ]
+
+
+def _scatter_updates(engine, rows, color_by, trendlines):
+    """
+    Filter-dependent trace properties of the scatter plot, as (trace index, properties) pairs.
+
+    Trace slots are fixed for a given dataset and `color_by` (k categories): faded points of every
+    category (0..k-1), highlighted points (k..2k-1), the overall trend line (2k) and one trend
+    line per category (2k+1..3k). Empty highlight or trend slots get empty arrays, so a filter
+    change only has to replace the data of these slots. In the density view the highlighted slots
+    hold occupied cells with their row counts as marker sizes instead of single points.
+    """
+    categories = engine.categories[color_by]
+    k = len(categories)
+    if uses_density_view(engine):
+        highlighted = _density_groups(engine, rows, color_by)
+    else:
+        highlighted = _point_groups(engine, rows, color_by)
+
+    updates = []
+    for idx, category in enumerate(categories):
+        category_visible = len(highlighted[idx]["x"]) > 0
+        trend_x, trend_y = trendlines[0].get(category, ([], []))
+        # Each category is listed once in the legend: highlighted if visible, faded otherwise
+        updates.append((idx, {"showlegend": not category_visible}))
+        updates.append((k + idx, dict(highlighted[idx], showlegend=category_visible)))
+        updates.append((2 * k + 1 + idx, {"x": trend_x, "y": trend_y}))
+
+    trend_x, trend_y = trendlines[1] if trendlines[1] is not None else ([], [])
+    updates.append((2 * k, {"x": trend_x, "y": trend_y, "showlegend": trendlines[1] is not None}))
+    return updates
+
+
+def _updates_patch(updates):
+    """Patch setting the given (trace index, properties) pairs on a figure already in the browser."""
+    patch = Patch()
+    for trace_idx, props in updates:
+        _set_patch_props(patch["data"][trace_idx], props)
+    return patch
+
+
+def _set_patch_props(target, props):
+    for key, value in props.items():
+        if isinstance(value, dict):
+            # Nested properties (e.g. marker.size) are set one by one, keeping the other marker settings
+            _set_patch_props(target[key], value)
+        else:
+            target[key] = compact_array(value) if isinstance(value, np.ndarray) else value
+
+
+def build_scatter_figure(engine, rows, color_by, trendlines):
+    """
+    Salary vs experience scatter plot with the filtered rows highlighted.
+
+    The faded background holds every point of each category and does not depend on the filter;
+    highlighted points are drawn on top of it. See `_scatter_updates` for the trace layout.
+
+    Above `SCATTER_MAX_POINTS` rows the points are binned per category into experience-year ×
+    salary cells and each occupied cell is drawn as one marker sized by its row count, so the
+    figure size depends on the number of cells rather than rows. Trendlines are fitted on the
+    rows either way. Whether a dataset uses the density view depends only on its size, so figures
+    of the same dataset version can always be patched.
+
+    Args:
+        engine (FilterEngine): Index over the full dataset.
+        rows (np.ndarray): Positions of the filtered rows (from `FilterEngine.select`).
+        color_by (str): Column to color and fit trendlines by.
+        trendlines (tuple): ({category: (trend_x, trend_y)}, overall line or None), as returned
+            by `TrendlineModel.trendlines` for the same filter state and `color_by`.
+
+    Returns:
+        go.Figure: The complete figure.
+    """
+    categories = engine.categories[color_by]
+
+    if uses_density_view(engine):
+        # Background: occupied cells of the full data. Marker area is proportional to the row count,
+        # on one scale for every trace so that highlighted cells sit inside their background cells.
+        background = _density_groups(engine, None, color_by)
+        max_count = max((group["marker"]["size"].max() for group in background if len(group["x"])), default=1)
+        sizing = dict(sizemode="area", sizeref=2 * max_count / DENSITY_MAX_MARKER_PX ** 2, sizemin=3)
+        faded_marker = dict(sizing)
+        highlighted_marker = dict(sizing, line=dict(width=1, color="white"))
+        hover = dict(hovertemplate="%{marker.size} rows<extra>%{fullData.name}</extra>")
+    else:
+        # Background: every point per category
+        background = _point_groups(engine, np.arange(engine.n_rows), color_by)
+        faded_marker = dict(size=15)
+        highlighted_marker = dict(size=20, line=dict(width=1, color="white"))
+        hover = dict(hoverinfo="skip")
+
+    fig = go.Figure()
+    for idx, category in enumerate(categories):
+        fig.add_trace(go.Scattergl(
+            mode='markers',
+            marker=dict(faded_marker, color=category_color(idx)['faded']),
+            name=category,
+            hoverinfo="skip"
+        ))
+        fig.data[-1].update(background[idx])
+    for idx, category in enumerate(categories):  # Highlighted points on top
+        fig.add_trace(go.Scattergl(
+            mode='markers',
+            marker=dict(highlighted_marker, color=category_color(idx)['opaque']),
+            name=category,
+            **hover,
+        ))
+
+    # **General trend line for all data (black)**
+    fig.add_trace(go.Scattergl(
+        mode="lines",
+        line=dict(color="black", width=2),
+        name="Trend line",
+        hoverinfo="skip"
+    ))
+    for idx, category in enumerate(categories):
+        fig.add_trace(go.Scattergl(
+            mode="lines",
+            line=dict(color=category_color(idx)["darker"], width=2),
+            showlegend=False,  # Hide from legend
+            hoverinfo="skip"
+        ))
+
+    for trace_idx, props in _scatter_updates(engine, rows, color_by, trendlines):
+        fig.data[trace_idx].update(props)
+
+    fig.update_layout(
+        xaxis_title="Experience (years)",
+        yaxis_title="Monthly Salary",
+        # hovermode="closest"
+        legend=dict(
+            font=dict(size=16)  # Adjust size as needed
+        )
+    )
+    return fig
+
+
+def scatter_patch(engine, rows, color_by, trendlines):
+    """
+    Incremental update of a figure from `build_scatter_figure` with the same `color_by`.
+
+    Only the highlighted points, trend lines and legend flags are sent; the faded background
+    and the layout already in the browser are left untouched.
+
+    Returns:
+        dash.Patch: Patch for the `figure` property of the graph.
+    """
+    return _updates_patch(_scatter_updates(engine, rows, color_by, trendlines))
+
+
+def _nice_size(rough_size):
+    """Round a positive bin size up to 2, 5 or 10 times a power of ten."""
+    base = 10 ** np.floor(np.log10(rough_size))
+    return base * next((step for step in (2, 5) if step > rough_size / base), 10)
+
+
+def histogram_bins(sorted_values, nbins=20):
+    """
+    Bin edges and counts the way Plotly auto-bins a histogram with `nbins`.
+
+    The bin size is the range divided by `nbins`, rounded up to 2, 5 or 10 times a power of ten.
+    Bins start one size below the first multiple of the size at or above the minimum, then get
+    shifted so that (almost) no value sits exactly on a bin edge, as in Plotly's autoBin.
+
+    Args:
+        sorted_values (np.ndarray): Values in ascending order (at least one).
+        nbins (int): Requested number of bins.
+
+    Returns:
+        tuple: (edges, counts) with len(edges) == len(counts) + 1.
+    """
+    data_min, data_max = float(sorted_values[0]), float(sorted_values[-1])
+    rough_size = (data_max - data_min) / nbins
+    size = _nice_size(rough_size) if rough_size > 0 else 1.0  # 1 for a single distinct value
+
+    start = np.ceil((data_min - (data_max - data_min) * 1e-4) / size) * size - size
+    if np.all(np.mod(sorted_values, 1) == 0):
+        # Whole numbers: start half a unit down so no value is on an edge
+        if size < 1:
+            start = data_min - 0.5 * size
+        else:
+            start -= 0.5
+            if start + size < data_min:
+                start += size
+    else:
+        def near_edge(values):
+            return np.fmod(1 + (values - start) * 100 / size, 100) < 2
+
+        edge_count = near_edge(sorted_values).sum()
+        mid_count = near_edge(sorted_values + size / 2).sum()
+        if mid_count < 0.1 * len(sorted_values) and (edge_count > 0.3 * len(sorted_values) or near_edge(data_min) or near_edge(data_max)):
+            # Lots of points on the edges and few in the middle: shift half a bin
+            start += size / 2 if start + size / 2 < data_min else -size / 2
+
+    n_bins = 1 + int(np.floor((data_max - start) / size))
+    edges = start + size * np.arange(n_bins + 1)
+    # Bins include their left edge (with Plotly's tolerance); values are sorted so counts are
+    # differences of insertion points
+    counts = np.diff(np.searchsorted(sorted_values, edges - 1e-9 * size, side="left"))
+    return edges, counts
+
+
+def box_summary(sorted_values):
+    """
+    Box plot statistics computed the way Plotly does for a `box` trace (default quartile method).
+
+    Returns:
+        dict: q1, median, q3, lowerfence, upperfence, notchspan and the outlier values.
+    """
+    n = len(sorted_values)
+
+    def interp(q):
+        # Plotly's linear quartile method: position q * n - 0.5, clamped to the data
+        position = min(max(q * n - 0.5, 0), n - 1)
+        lo = int(np.floor(position))
+        hi = min(lo + 1, n - 1)
+        return float(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (position - lo))
+
+    q1, median, q3 = interp(0.25), interp(0.5), interp(0.75)
+    iqr = q3 - q1
+    lo_idx = np.searchsorted(sorted_values, q1 - 1.5 * iqr, side="left")
+    hi_idx = np.searchsorted(sorted_values, q3 + 1.5 * iqr, side="right") - 1
+    lowerfence = min(q1, float(sorted_values[min(lo_idx, n - 1)]))
+    upperfence = max(q3, float(sorted_values[max(hi_idx, 0)]))
+    outliers = np.concatenate([sorted_values[:lo_idx], sorted_values[hi_idx + 1:]])
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": lowerfence,
+        "upperfence": upperfence,
+        "notchspan": float(1.57 * iqr / np.sqrt(n)),
+        "outliers": outliers,
+    }
+
+
+def _histogram_updates(sorted_salaries):
+    """Filter-dependent properties of the histogram traces (bars, box, box outliers)."""
+    edges, counts = histogram_bins(sorted_salaries, nbins=20)
+    box = box_summary(sorted_salaries)
+    # Outliers overlap on one line anyway: one marker per distinct salary, with its count for hover
+    outlier_values, outlier_counts = np.unique(box["outliers"], return_counts=True)
+    return [
+        (0, {
+            "x": (edges[:-1] + edges[1:]) / 2,
+            "y": counts,
+            # Bin range shown on hover, like Plotly's own histogram
+            "customdata": np.stack([np.ceil(edges[:-1]), np.ceil(edges[1:]) - 1], axis=1),
+        }),
+        (1, {key: [box[key]] for key in ("q1", "median", "q3", "lowerfence", "upperfence", "notchspan")}),
+        (2, {"x": outlier_values, "y": np.zeros(len(outlier_values)), "customdata": outlier_counts}),
+    ]
+
+
+def build_histogram_figure(sorted_salaries):
+    """
+    Salary distribution histogram with a box plot marginal, binned on the server.
+
+    Only bin counts, the five-number summary and the distinct outlier values (with their counts)
+    are sent to the browser, so the figure size does not grow with the number of rows. The layout
+    matches what `px.histogram(..., nbins=20, marginal="box", opacity=0.7)` produced before.
+
+    Args:
+        sorted_salaries (np.ndarray): Filtered salaries in ascending order (at least one).
+
+    Returns:
+        go.Figure: Bars, box and box outliers.
+    """
+    color = "#636efa"
+    fig = go.Figure([
+        go.Bar(
+            marker=dict(color=color, opacity=0.7),
+            hovertemplate="Total Monthly Salary=%{customdata[0]}-%{customdata[1]}<br>count=%{y}<extra></extra>",
+            showlegend=False, xaxis="x", yaxis="y",
+        ),
+        go.Box(
+            y=[0], orientation="h", notched=True, marker=dict(color=color),
+            hoverinfo="x", showlegend=False, xaxis="x2", yaxis="y2",
+        ),
+        go.Scatter(
+            mode="markers", marker=dict(color=color),
+            hovertemplate="Total Monthly Salary=%{x}<br>count=%{customdata}<extra></extra>",
+            showlegend=False, xaxis="x2", yaxis="y2",
+        ),
+    ])
+    for trace_idx, props in _histogram_updates(sorted_salaries):
+        fig.data[trace_idx].update(props)
+
+    fig.update_layout(
+        xaxis=dict(anchor="y", domain=[0.0, 1.0], title=dict(text="Total Monthly Salary")),
+        yaxis=dict(anchor="x", domain=[0.0, 0.8316], title=dict(text="count")),
+        xaxis2=dict(anchor="y2", domain=[0.0, 1.0], matches="x", showticklabels=False, showgrid=True),
+        yaxis2=dict(anchor="x2", domain=[0.8416, 1.0], showticklabels=False, showline=False, ticks="", showgrid=False),
+        legend=dict(tracegroupgap=0),
+        margin=dict(t=60),
+        barmode="relative",
+        bargap=0.1,
+    )
+    return fig
+
+
+def histogram_patch(sorted_salaries):
+    """Incremental update of a figure from `build_histogram_figure`: new bins, box and outliers."""
+    return _updates_patch(_histogram_updates(sorted_salaries))
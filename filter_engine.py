@@ -0,0 +1,108 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Facets that can be toggled in the checklists (column name -> filter argument order)
+FACET_COLUMNS = ("Job Title", "Department", "Specialist eller ST-fysiker")
+EXPERIENCE_COLUMN = "ExperienceYears"
+
+
+def dataset_version(df):
+    """Short content hash of a dataframe, identical for identical data in every process."""
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()[:12]
+
+
+class FilterEngine:
+    """
+    Precomputed row index over the salary dataframe.
+
+    For every value of each facet column a packed bitmap (one bit per row) is built once,
+    together with a sorted index of the experience column. A query ORs the bitmaps of the
+    selected values within a facet, ANDs the facets together and intersects the result
+    with the experience range, without ever copying the dataframe.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = len(df)
+        self.version = dataset_version(df)
+
+        # facet -> {value: packed bitmap}, plus the factorized column (categories in order of appearance)
+        self.bitmaps = {}
+        self.has_missing = {}
+        self.codes = {}
+        self.categories = {}
+        for column in FACET_COLUMNS:
+            # Compare small integer codes instead of strings (categorical columns are never materialized)
+            codes, uniques = pd.factorize(df[column])
+            self.codes[column] = codes
+            self.categories[column] = list(uniques)
+            self.bitmaps[column] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(uniques)
+            }
+            self.has_missing[column] = bool(df[column].hasnans)
+
+        # Sorted experience index for range lookups (NaN sorts last and never matches a range)
+        experience = df[EXPERIENCE_COLUMN].to_numpy(dtype=float)
+        self.exp_order = np.argsort(experience, kind="stable")
+        self.exp_sorted = experience[self.exp_order]
+
+        self._all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def __repr__(self):
+        return f"FilterEngine(version={self.version}, rows={self.n_rows})"
+
+    def _facet_bitmap(self, column, selected_values):
+        """OR together the bitmaps of the selected values, or None if nothing is filtered out."""
+        bitmaps = self.bitmaps[column]
+        selected = [bitmaps[value] for value in set(selected_values) if value in bitmaps]
+        if len(selected) == len(bitmaps) and not self.has_missing[column]:
+            return None  # Every value is selected, the facet does not restrict anything
+        if not selected:
+            return np.zeros_like(self._all_rows)
+        return np.bitwise_or.reduce(selected)
+
+    def _experience_bitmap(self, exp_range):
+        lo = np.searchsorted(self.exp_sorted, exp_range[0], side="left")
+        hi = np.searchsorted(self.exp_sorted, exp_range[1], side="right")
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.exp_order[lo:hi]] = True
+        return np.packbits(mask)
+
+    def mask(self, selected_jobs, selected_depts, selected_specialists, exp_range=None):
+        """
+        Boolean row mask for a filter state.
+
+        Args:
+            selected_jobs (iterable): Job titles to keep.
+            selected_depts (iterable): Departments to keep.
+            selected_specialists (iterable): Specialist values to keep.
+            exp_range (tuple | None): Inclusive (min, max) experience years, or None for no limit.
+
+        Returns:
+            np.ndarray: Boolean array with one entry per row of the dataframe.
+        """
+        bits = self._all_rows
+        for column, selected_values in zip(FACET_COLUMNS, (selected_jobs, selected_depts, selected_specialists)):
+            facet_bits = self._facet_bitmap(column, selected_values)
+            if facet_bits is not None:
+                bits = bits & facet_bits
+        if exp_range:
+            bits = bits & self._experience_bitmap(exp_range)
+        return np.unpackbits(bits, count=self.n_rows).astype(bool)
+
+    def select(self, selected_jobs, selected_depts, selected_specialists, exp_range=None):
+        """
+        Row positions (in dataframe order) matching a filter state.
+
+        Returns:
+            np.ndarray: Sorted, read-only integer positions, usable with `df.iloc` / `df.take`.
+        """
+        rows = np.flatnonzero(self.mask(selected_jobs, selected_depts, selected_specialists, exp_range))
+        rows.flags.writeable = False  # Results are shared through the cache
+        return rows
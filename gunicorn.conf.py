@@ -0,0 +1,35 @@
+"""
+gunicorn settings for running several workers: `gunicorn app:server` picks this file up.
+
+The app (dataset, indexes and callbacks) is imported once in the master before the workers are
+forked, so they share the loaded data copy-on-write (and the snapshot through the page cache).
+Computed results are shared through the cache backend chosen in app.py (CACHE_REDIS_URL,
+CACHE_BACKEND, CACHE_DIR), and metrics through METRICS_DIR.
+"""
+import glob
+import multiprocessing
+import os
+
+IS_AZURE = "WEBSITE_HOSTNAME" in os.environ
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}" if IS_AZURE else os.environ.get("BIND", "127.0.0.1:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count() + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+accesslog = "-" if IS_AZURE else None
+# Workers share their metrics through this directory, so /metrics reports all of them (see metrics.py)
+METRICS_DIR = os.environ.setdefault("METRICS_DIR", "/tmp/salary-dashboard-metrics")
+
+
+def on_starting(server):
+    # Counters start from zero with every run: drop the snapshots of an earlier one
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    # Background threads are not inherited by forked workers, start the dataset watcher and the
+    # cache warm-up in each
+    import app
+    app.start_background_tasks()
@@ -12,80 +12,105 @@ width = f"max(800px, min({width}, 2000px))"
 height = f"min({height}, {width})" # height should not be larger the width
 width = f"min({width}, calc(2 * {height}))" # Width should not be larger than 2 * height
 
-layout = dbc.Container(fluid=True, style={"height": "100vh"}, children=[
-    html.H1("Salary Dashboard", className="text-center my-3"),
+# Default view: the first tab, grouping and experience range a visitor sees
+DEFAULT_TAB = "scatterplot2"
+DEFAULT_COLOR_BY = "Job Title"
+DEFAULT_EXP_RANGE = [0, 50]
+# Values of the tabs and of the color-by dropdown
+TABS = ("scatterplot2", "histogram", "statistics")
+COLOR_BY_OPTIONS = ("Job Title", "Department", "Specialist eller ST-fysiker")
+# Space between a filter checkbox and its label (options are plain text to keep responses small)
+CHECKLIST_INPUT_STYLE = {"margin-right": "8px"}
+
+
+def build_layout():
+    """A new layout tree; app.py fills in the prerendered default view for each page load."""
+    return dbc.Container(fluid=True, style={"height": "100vh"}, children=[
+        html.H1("Salary Dashboard", className="text-center my-3"),
     
-    # Filters (Always Visible)
-    dbc.Row([
-        dbc.Col([
-            html.Label("Color and trendlines by:"),
-            dcc.Dropdown(
-                id="color-by-dropdown",
-                options=[
-                    {"label": "Job Title", "value": "Job Title"},
-                    {"label": "Specialist Type", "value": "Specialist eller ST-fysiker"},
-                    {"label": "Department", "value": "Department"}
-                ],
-                value="Job Title",  # Default color by Job Title
-                clearable=False
-            )
-        ], style={"flex": "20"}),
-        dbc.Col([
-            html.Label("Job Title:"),
-            dcc.Checklist(
-                id="job-title-filter",
-                options=[],  # Will be set dynamically
-                value=[],  # Default: All checked (set dynamically)
-                style={"display": "flex", "flexDirection": "column"}
-            )
-        ], style={"flex": "20"}),
-        dbc.Col([
-            html.Label("Department:"),
-            dcc.Checklist(
-                id="department-filter",
-                options=[],  # Will be set dynamically
-                value=[],  # Default: All checked (set dynamically)
-                style={"display": "flex", "flexDirection": "column"}
-            )
-        ], style={"flex": "20"}),
-        dbc.Col([
-            html.Label("Specialist:"),
-            dcc.Checklist(
-                id="specialist-filter",
-                options=[],  # Will be set dynamically
-                value=[],  # Default: All checked (set dynamically)
-                style={"display": "flex", "flexDirection": "column"}
-            )
-        ], style={"flex": "12"}),
-        dbc.Col([
-            html.Label("Years of Experience:"),
-            dcc.RangeSlider(id="exp-slider", min=0, max=50, step=1, value=[0, 50],
-                            marks={i: str(i) for i in range(0, 51, 5)})  # Marks every 5 years
-        ], style={"flex": "40"}),
-        dbc.Col([
-            html.Button("Reset Filters", id="reset-filters", n_clicks=0, className="btn btn-primary")
-        ], style={"flex": "10", "display": "flex", "align-items": "center", "justify-content": "center"}),
+        # Filters (Always Visible)
+        dbc.Row([
+            dbc.Col([
+                html.Label("Color and trendlines by:"),
+                dcc.Dropdown(
+                    id="color-by-dropdown",
+                    options=[
+                        {"label": "Job Title", "value": "Job Title"},
+                        {"label": "Specialist Type", "value": "Specialist eller ST-fysiker"},
+                        {"label": "Department", "value": "Department"}
+                    ],
+                    value=DEFAULT_COLOR_BY,  # Default color by Job Title
+                    clearable=False
+                )
+            ], style={"flex": "20"}),
+            dbc.Col([
+                html.Label("Job Title:"),
+                dcc.Checklist(
+                    id="job-title-filter",
+                    options=[],  # Will be set dynamically
+                    value=[],  # Default: All checked (set dynamically)
+                    style={"display": "flex", "flexDirection": "column"}
+                )
+            ], style={"flex": "20"}),
+            dbc.Col([
+                html.Label("Department:"),
+                dcc.Checklist(
+                    id="department-filter",
+                    options=[],  # Will be set dynamically
+                    value=[],  # Default: All checked (set dynamically)
+                    style={"display": "flex", "flexDirection": "column"}
+                )
+            ], style={"flex": "20"}),
+            dbc.Col([
+                html.Label("Specialist:"),
+                dcc.Checklist(
+                    id="specialist-filter",
+                    options=[],  # Will be set dynamically
+                    value=[],  # Default: All checked (set dynamically)
+                    style={"display": "flex", "flexDirection": "column"}
+                )
+            ], style={"flex": "12"}),
+            dbc.Col([
+                html.Label("Years of Experience:"),
+                dcc.RangeSlider(id="exp-slider", min=0, max=50, step=1, value=DEFAULT_EXP_RANGE,
+                                marks={i: str(i) for i in range(0, 51, 5)})  # Marks every 5 years
+            ], style={"flex": "40"}),
+            dbc.Col([
+                html.Button("Reset Filters", id="reset-filters", n_clicks=0, className="btn btn-primary")
+            ], style={"flex": "10", "display": "flex", "align-items": "center", "justify-content": "center"}),
+
+        ], className="mb-4 d-flex"),
 
-    ], className="mb-4 d-flex"),
+        # Output of the filter stage: dataset version and canonical filter state
+        dcc.Store(id="filter-state"),
+        # Random id per page load, for per-session background work (see speculative.py)
+        dcc.Store(id="session-id"),
 
-    # Tabs for switching views
-    dcc.Tabs(id="tabs", value="scatterplot2", children=[
-        dcc.Tab(label="Salary vs Experience", value="scatterplot2"),
-        dcc.Tab(label="Salary Distribution", value="histogram"),
-        dcc.Tab(label="Statistics", value="statistics"),
-    ]),
+        # Tabs for switching views
+        dcc.Tabs(id="tabs", value=DEFAULT_TAB, children=[
+            dcc.Tab(label="Salary vs Experience", value="scatterplot2"),
+            dcc.Tab(label="Salary Distribution", value="histogram"),
+            dcc.Tab(label="Statistics", value="statistics"),
+        ]),
 
-    # Graph container
-    html.Div(
-        id="tab-content",
-        style={
-            "height": height,
-            "width": width,
-            "display": "flex",
-            "justifyContent": "center",
-            "alignItems": "start",
-            "margin": "0 auto",  # Ensures centering if it's inside another container
+        # Graph container
+        html.Div(
+            id="tab-content",
+            style={
+                "height": height,
+                "width": width,
+                "display": "flex",
+                "justifyContent": "center",
+                "alignItems": "start",
+                "margin": "0 auto",  # Ensures centering if it's inside another container
 
-        }
-    )
-])
+            },
+            children=[
+                # The graph stays mounted across filter changes so its figure can be patched in place
+                dcc.Graph(id="tab-graph", style={"width": "100%", "height": "100%"}),
+                html.Div(id="stats-content"),
+                # Tab, color grouping and dataset version the figure in tab-graph was built for
+                dcc.Store(id="graph-render-key"),
+            ]
+        )
+    ])
@@ -0,0 +1,298 @@
+"""
+Request instrumentation for the Flask server behind the Dash app.
+
+Callback phases are timed with `metrics.phase(name)`; the time from a callback returning to its
+response being ready (JSON encoding and compression) is recorded as the "serialization" phase,
+and the size of every callback response body is recorded per callback (per tab for
+`update_graph`), both uncompressed and as sent. Everything is served in the Prometheus text
+format on `/metrics`, together with the result cache counters.
+
+The registry lives in each process. With several workers (gunicorn), `init_metrics` is given a
+directory shared by them (METRICS_DIR): every worker writes a snapshot of its registry there at
+most every FLUSH_INTERVAL_S seconds, and `/metrics` sums the counters and histograms of all
+snapshots, so any worker answers for all of them. Snapshots of exited workers are kept, so
+counters never go backwards; gauges are per worker (a `worker` label with the pid) and only
+reported for live workers.
+
+Debug output goes through the "salary_dashboard" logger; set LOG_LEVEL=DEBUG to see it.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, request
+
+from cache_config import result_cache
+
+logger = logging.getLogger("salary_dashboard")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(_handler)
+logger.setLevel(os.environ.get("LOG_LEVEL", "WARNING").upper())
+logger.propagate = False
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 3_000, 10_000, 30_000, 100_000, 300_000, 1_000_000, 3_000_000, 10_000_000)
+
+DASH_UPDATE_PATH = "/_dash-update-component"
+FLUSH_INTERVAL_S = 1.0  # How far a worker's snapshot may lag behind its registry
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (the caller holds the lock)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts, total, count):
+        """Add the state of another process's histogram (as in `Metrics.snapshot`)."""
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+    def samples(self, name, labels):
+        """(sample name, labels, value) triples: cumulative buckets, sum and count."""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", dict(labels, le=repr(float(bound))), cumulative
+        yield f"{name}_bucket", dict(labels, le="+Inf"), self.count
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class Metrics:
+    """Thread-safe registry of the dashboard's histograms, counters and gauges, rendered as Prometheus text."""
+
+    # name -> (help text, buckets, label name)
+    HISTOGRAMS = {
+        "dashboard_phase_seconds": ("Latency of each callback phase.", LATENCY_BUCKETS, "phase"),
+        "dashboard_response_bytes": ("Size of callback response bodies before compression.", SIZE_BUCKETS, "callback"),
+        "dashboard_response_wire_bytes": ("Size of callback response bodies as sent.", SIZE_BUCKETS, "callback"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._values = {}  # name -> (type, help text, value) of counters and gauges
+        self.multiprocess_dir = None
+        self._flushed_at = 0.0
+
+    def observe(self, name, label, value):
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(label)
+            if histogram is None:
+                histogram = series[label] = Histogram(self.HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, help_text, amount=1):
+        """Add to a counter (the name should end in _total)."""
+        with self._lock:
+            _, _, value = self._values.get(name, (None, None, 0))
+            self._values[name] = ("counter", help_text, value + amount)
+
+    def set_gauge(self, name, help_text, value):
+        with self._lock:
+            self._values[name] = ("gauge", help_text, value)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one observation of phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("dashboard_phase_seconds", name, elapsed)
+            logger.debug("%s took %.4fs", name, elapsed)
+
+    def callback(self, name):
+        """
+        Decorator for Dash callbacks: tags the request with the callback name and marks when the
+        callback returned, so the response hook can attribute payload size and serialization time.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    g.metrics_callback = name
+                    g.metrics_callback_done = time.perf_counter()
+            return wrapper
+        return decorator
+
+    def label_payload(self, label):
+        """Record the size of the current callback's response under `label` instead of its name."""
+        g.metrics_payload = label
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self.HISTOGRAMS}
+            self._values = {}
+
+    def snapshot(self):
+        """
+        JSON-serializable state of this process's registry, including the result cache counters.
+
+        Returns:
+            dict: "histograms" ({name: {label: [bucket counts, sum, count]}}) and "values"
+            ({name: [type, help text, value]}).
+        """
+        with self._lock:
+            histograms = {
+                name: {label: [list(histogram.counts), histogram.sum, histogram.count] for label, histogram in series.items()}
+                for name, series in self._histograms.items()
+            }
+            values = {name: list(value) for name, value in self._values.items()}
+
+        cache_stats = result_cache.stats()
+        for key, kind, help_text in (
+            ("hits", "counter", "Result cache lookups answered from the cache."),
+            ("misses", "counter", "Result cache lookups that had to compute the result."),
+            ("evictions", "counter", "Result cache entries evicted to stay within budget."),
+            ("shared_hits", "counter", "Local result cache misses answered by the shared backend."),
+            ("entries", "gauge", "Entries currently in the result cache."),
+            ("bytes", "gauge", "Estimated size of the result cache."),
+            ("max_bytes", "gauge", "Memory budget of the result cache."),
+        ):
+            name = f"dashboard_result_cache_{key}" + ("_total" if kind == "counter" else "")
+            values[name] = [kind, help_text, cache_stats[key]]
+        return {"histograms": histograms, "values": values}
+
+    def flush(self, force=False):
+        """Write this process's snapshot to the multiprocess directory (at most every FLUSH_INTERVAL_S)."""
+        if self.multiprocess_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < FLUSH_INTERVAL_S:
+            return
+        self._flushed_at = now
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f"{path}.tmp", path)  # Readers never see a half-written snapshot
+        except OSError:  # Metrics must not fail the request
+            logger.warning("Could not write metrics snapshot %s", path, exc_info=True)
+
+    def _read_snapshots(self):
+        """{pid: snapshot} of every process that wrote to the multiprocess directory."""
+        snapshots = {}
+        for path in glob.glob(os.path.join(self.multiprocess_dir, "*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots[int(os.path.basename(path).removesuffix(".json"))] = json.load(f)
+            except (OSError, ValueError):  # Removed or replaced while listing
+                continue
+        return snapshots
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (of every worker, see module docstring)."""
+        if self.multiprocess_dir is None:
+            return render_snapshots({os.getpid(): self.snapshot()}, per_worker=False)
+        self.flush(force=True)
+        return render_snapshots(self._read_snapshots(), per_worker=True)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def render_snapshots(snapshots, per_worker):
+    """
+    Prometheus text for {pid: snapshot} (see `Metrics.snapshot`): histograms and counters are
+    summed over the snapshots; with `per_worker`, gauges get a `worker` label and are left out
+    for processes that have exited.
+    """
+    histograms = {name: {} for name in Metrics.HISTOGRAMS}
+    values = {}  # name -> (type, help text, {pid: value})
+    for pid, snapshot in sorted(snapshots.items()):
+        for name, series in snapshot["histograms"].items():
+            for label, state in series.items():
+                histogram = histograms[name].get(label)
+                if histogram is None:
+                    histogram = histograms[name][label] = Histogram(Metrics.HISTOGRAMS[name][1])
+                histogram.merge(*state)
+        live = not per_worker or _pid_alive(pid)
+        for name, (kind, help_text, value) in snapshot["values"].items():
+            if kind == "gauge" and not live:
+                continue
+            values.setdefault(name, (kind, help_text, {}))[2][pid] = value
+
+    lines = []
+    for name, series in histograms.items():
+        help_text, _, label_name = Metrics.HISTOGRAMS[name]
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for label, histogram in sorted(series.items()):
+            for sample, labels, value in histogram.samples(name, {label_name: label}):
+                lines.append(f"{sample}{_format_labels(labels)} {value}")
+    for name, (kind, help_text, by_pid) in sorted(values.items()):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "gauge" and per_worker:
+            lines += [f"{name}{_format_labels({'worker': pid})} {value}" for pid, value in by_pid.items()]
+        else:
+            lines.append(f"{name} {sum(by_pid.values())}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+def init_metrics(app, multiprocess_dir=None):
+    """
+    Record callback response sizes and serialization time, and serve `/metrics` on the Flask server.
+
+    Args:
+        multiprocess_dir (str | None): Directory shared by the worker processes, to report the
+            metrics of all of them on `/metrics` (see the module docstring).
+    """
+    server = app.server
+    if multiprocess_dir:
+        os.makedirs(multiprocess_dir, exist_ok=True)
+        metrics.multiprocess_dir = multiprocess_dir
+
+    @server.after_request
+    def record_response(response):
+        if request.path.endswith(DASH_UPDATE_PATH) and response.status_code == 200 and "metrics_callback" in g:
+            name = g.get("metrics_payload", g.metrics_callback)
+            metrics.observe("dashboard_phase_seconds", "serialization", time.perf_counter() - g.metrics_callback_done)
+            if not response.direct_passthrough:
+                wire_bytes = response.calculate_content_length() or 0
+                metrics.observe("dashboard_response_bytes", name, g.get("uncompressed_bytes", wire_bytes))
+                metrics.observe("dashboard_response_wire_bytes", name, wire_bytes)
+        metrics.flush()
+        return response
+
+    @server.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,70 @@
+"""
+Compact JSON encoding of the figures sent in callback responses.
+
+Numeric trace arrays are sent as base64 typed arrays ({"dtype", "bdata"}, decoded by plotly.js
+since 2.28) instead of decimal text: whole numbers (kronor, years, row counts) as the smallest
+integer type that holds them, anything else as float64, so no value changes. The default plotly
+template that comes with every figure is cut down to the trace types and subplots it uses.
+"""
+import base64
+
+import numpy as np
+
+COMPACT_MIN_LENGTH = 8  # Shorter arrays are smaller as plain JSON lists
+INTEGER_DTYPES = ("u1", "i1", "u2", "i2", "u4", "i4")
+# Template layout entries that only style subplot types the dashboard never draws
+UNUSED_TEMPLATE_LAYOUT = ("geo", "mapbox", "polar", "scene", "ternary")
+
+
+def compact_array(values):
+    """
+    JSON value for a numeric array: a typed array spec, or a plain list for short, 2-d or
+    non-numeric arrays.
+    """
+    values = np.asarray(values)
+    if values.ndim != 1 or len(values) < COMPACT_MIN_LENGTH or values.dtype.kind not in "iuf":
+        return values.tolist()
+
+    dtype = "f8"
+    if values.dtype.kind in "iu" or (np.isfinite(values).all() and (values == np.round(values)).all()):
+        low, high = values.min(), values.max()
+        dtype = next((d for d in INTEGER_DTYPES if np.iinfo(d).min <= low and high <= np.iinfo(d).max), "f8")
+    data = values.astype("<" + dtype).tobytes()
+    return {"dtype": dtype, "bdata": base64.b64encode(data).decode("ascii")}
+
+
+def _compact_props(props):
+    compacted = {}
+    for key, value in props.items():
+        if isinstance(value, dict):
+            compacted[key] = _compact_props(value)
+        elif isinstance(value, np.ndarray):
+            compacted[key] = compact_array(value)
+        else:
+            compacted[key] = value
+    return compacted
+
+
+def compact_figure(fig):
+    """
+    Figure as a plain dict ready for a callback response, with compact arrays and template.
+
+    Args:
+        fig (go.Figure): Figure from `figures.py`.
+
+    Returns:
+        dict: "data" and "layout".
+    """
+    figure = fig.to_plotly_json()
+    data = [_compact_props(trace) for trace in figure["data"]]
+    layout = _compact_props(figure["layout"])
+
+    template = layout.get("template")
+    if template:
+        used_types = {trace.get("type", "scatter") for trace in data}
+        layout["template"] = dict(
+            template,
+            data={trace_type: traces for trace_type, traces in template.get("data", {}).items() if trace_type in used_types},
+            layout={key: value for key, value in template.get("layout", {}).items() if key not in UNUSED_TEMPLATE_LAYOUT},
+        )
+    return {"data": data, "layout": layout}
@@ -0,0 +1,109 @@
+"""
+Speculative rendering of the tabs a visitor is not looking at.
+
+After `update_graph` answers for the active tab, the other tabs are rendered for the same filter
+state and grouping on a small thread pool, so their results are already cached when the visitor
+switches tabs. Work is tracked per browser session: a newer request from the same session
+cancels whatever is still queued for the older one. Speculative tasks wait while foreground
+callbacks are running and are dropped when too many are queued, so they never hold up requests.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import metrics
+
+logger = logging.getLogger("salary_dashboard")
+
+
+class SpeculativeRenderer:
+    """
+    Runs speculative tasks on at most `max_workers` threads, with at most `max_pending` queued.
+
+    Args:
+        max_workers (int): Threads for speculative work (0 disables it).
+        max_pending (int): Queued or running tasks over which new submissions are dropped.
+        max_sessions (int): Sessions whose latest generation is remembered (least recent forgotten).
+    """
+
+    def __init__(self, max_workers=1, max_pending=8, max_sessions=10_000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="speculative") if max_workers > 0 else None
+        self._condition = threading.Condition()
+        self._sessions = OrderedDict()  # session id -> (generation, futures)
+        self._pending = 0
+        self._foreground = 0
+
+    @contextmanager
+    def foreground(self):
+        """Mark a foreground callback as running; speculative tasks wait until none are."""
+        with self._condition:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._foreground -= 1
+                self._condition.notify_all()
+
+    def submit(self, session_id, tasks):
+        """
+        Queue `tasks` (callables) for a session, cancelling its queued tasks from earlier calls.
+
+        Returns:
+            int: Number of tasks queued.
+        """
+        if self._executor is None or not session_id:
+            return 0
+        with self._condition:
+            generation, futures = self._sessions.pop(session_id, (0, []))
+            cancelled = sum(future.cancel() for future in futures)
+            if cancelled:
+                metrics.increment("dashboard_speculative_cancelled_total", "Speculative renders cancelled by a newer request.", cancelled)
+            generation += 1
+
+            queued = []
+            for task in tasks:
+                if self._pending >= self.max_pending:
+                    metrics.increment("dashboard_speculative_dropped_total", "Speculative renders dropped because the queue was full.")
+                    continue
+                self._pending += 1
+                future = self._executor.submit(self._run, session_id, generation, task)
+                future.add_done_callback(self._task_done)
+                queued.append(future)
+
+            self._sessions[session_id] = (generation, queued)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return len(queued)
+
+    def _is_current(self, session_id, generation):
+        entry = self._sessions.get(session_id)
+        return entry is not None and entry[0] == generation
+
+    def _run(self, session_id, generation, task):
+        with self._condition:
+            # Foreground requests first; a newer request of the same session makes this one moot
+            while self._foreground and self._is_current(session_id, generation):
+                self._condition.wait(0.05)
+            if not self._is_current(session_id, generation):
+                metrics.increment("dashboard_speculative_cancelled_total", "Speculative renders cancelled by a newer request.")
+                return
+        try:
+            task()
+        except Exception:
+            logger.exception("Speculative render failed")
+            return
+        metrics.increment("dashboard_speculative_completed_total", "Speculative renders completed.")
+
+    def _task_done(self, future):
+        with self._condition:
+            self._pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,87 @@
+"""
+Startup profiling for `python app.py --profile-startup`.
+
+The profiler hooks `__import__` to time every module the first time it is loaded (inclusive of
+the modules it imports, plus its own share), and `profiler.step(name)` times the initialization
+steps in app.py. The report lists the slowest modules and every step, and the run fails if the
+total is over STARTUP_BUDGET_S seconds (default 5).
+"""
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+STARTUP_BUDGET_S = float(os.environ.get("STARTUP_BUDGET_S", "5"))
+
+
+class StartupProfiler:
+    """Import and initialization timings of one process start."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}  # module -> (inclusive seconds, self seconds)
+        self.steps = []  # (name, seconds), in order
+        self._child_time = []  # Time spent in nested imports, one entry per import in progress
+        self._original_import = None
+
+    def install(self):
+        """Start timing imports of modules that are not loaded yet."""
+        if self._original_import is not None:
+            return
+        self.started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._child_time.pop()
+            if self._child_time:
+                self._child_time[-1] += elapsed
+            self.imports[name] = (elapsed, elapsed - children)
+
+    @contextmanager
+    def step(self, name):
+        """Time an initialization step (recorded whether or not imports are being profiled)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self, top=20, budget=STARTUP_BUDGET_S):
+        """
+        Text report of the slowest imports and all initialization steps.
+
+        Returns:
+            tuple: (report text, whether the total startup time is within `budget`).
+        """
+        total = time.perf_counter() - self.started
+        lines = [f"Startup: {total:.3f}s (budget {budget:.1f}s)", "", f"Slowest imports (top {top}):"]
+        lines.append(f"  {'module':<45} {'total':>8} {'self':>8}")
+        by_total = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for module, (inclusive, own) in by_total[:top]:
+            lines.append(f"  {module:<45} {inclusive:7.3f}s {own:7.3f}s")
+        lines += ["", "Initialization steps:"]
+        for name, seconds in self.steps:
+            lines.append(f"  {name:<45} {seconds:7.3f}s")
+        within_budget = total <= budget
+        if not within_budget:
+            lines += ["", f"❌ Startup took {total:.3f}s, over the {budget:.1f}s budget"]
+        return "\n".join(lines), within_budget
+
+
+profiler = StartupProfiler()
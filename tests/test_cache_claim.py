@@ -0,0 +1,39 @@
+"""Only one of several processes sharing a cache claims a job such as the cache warm-up."""
+import multiprocessing
+import os
+import sys
+
+from cachelib import FileSystemCache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_config import LRUCache  # noqa: E402
+
+
+def _claim_in_process(cache_dir, start, results):
+    cache = LRUCache(1024, shared=FileSystemCache(cache_dir), claim_lock_path=os.path.join(cache_dir, "claims.lock"))
+    start.wait()
+    results.put(cache.claim("warm:v1"))
+
+
+def test_one_process_claims_a_shared_job(tmp_path):
+    context = multiprocessing.get_context("fork")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=_claim_in_process, args=(str(tmp_path), start, results)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    claims = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join()
+    assert sorted(claims) == [False] * 5 + [True]
+
+    # A new dataset version is a new job
+    cache = LRUCache(1024, shared=FileSystemCache(str(tmp_path)), claim_lock_path=str(tmp_path / "claims.lock"))
+    assert cache.claim("warm:v1") is False
+    assert cache.claim("warm:v2") is True
+
+
+def test_claim_without_shared_cache_always_succeeds():
+    cache = LRUCache(1024)
+    assert cache.claim("warm:v1") and cache.claim("warm:v1")
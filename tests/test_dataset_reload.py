@@ -0,0 +1,92 @@
+"""Reloads after the CSV changes while a snapshot exists, also from several processes at once."""
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset  # noqa: E402
+from dataset import DatasetManager, build_snapshot, load_dataset  # noqa: E402
+
+
+def write_csv(path, salaries, mtime):
+    pd.DataFrame({
+        "Befattning": ["Sjukhusfysiker"] * len(salaries),
+        "Arbetsplats": ["Universitetssjukhus"] * len(salaries),
+        "Specialist eller ST-fysiker": ["Specialist"] * len(salaries),
+        "Antal hela år med arbete i klinisk verksamhet": list(range(len(salaries))),
+        "Månadslön totalt": salaries,
+    }).to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+
+
+def test_newer_csv_rebuilds_snapshot_and_swaps(tmp_path):
+    csv_path = str(tmp_path / "salary_data.csv")
+    snapshot_path = str(tmp_path / "salary_data.snapshot")
+    now = time.time()
+    write_csv(csv_path, [40000, 45000, 50000], mtime=now - 200)
+    build_snapshot(csv_path, snapshot_path)
+    os.utime(snapshot_path, (now - 100, now - 100))
+
+    swaps = []
+    manager = DatasetManager(csv_path, snapshot_path, on_swap=lambda old, new: swaps.append((old, new)))
+    old = manager.current
+    assert manager.reload() is False  # Snapshot is up to date
+
+    write_csv(csv_path, [40000, 45000, 50000, 60000], mtime=now - 50)
+    assert manager.reload() is True
+    assert manager.current.version != old.version
+    assert manager.current.df["Månadslön totalt"].tolist() == [40000, 45000, 50000, 60000]
+    assert swaps == [(old, manager.current)]
+
+    # The rebuilt snapshot is what the next load reads, and the rebuild is not seen as a change
+    assert os.path.getmtime(snapshot_path) >= os.path.getmtime(csv_path)
+    assert manager._source_mtimes() == manager._loaded_mtimes
+    assert manager.reload() is False
+
+
+def _load_in_process(csv_path, snapshot_path, start, results):
+    start.wait()
+    df = load_dataset(csv_path, snapshot_path)
+    results.put((len(df), str(df["Job Title"].dtype)))
+
+
+def test_concurrent_reloads_rebuild_the_snapshot_once(tmp_path):
+    csv_path = str(tmp_path / "salary_data.csv")
+    snapshot_path = str(tmp_path / "salary_data.snapshot")
+    now = time.time()
+    write_csv(csv_path, [40000, 45000], mtime=now - 200)
+    build_snapshot(csv_path, snapshot_path)
+    os.utime(snapshot_path, (now - 100, now - 100))
+    write_csv(csv_path, list(range(40000, 41000)), mtime=now - 50)
+
+    context = multiprocessing.get_context("fork")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=_load_in_process, args=(csv_path, snapshot_path, start, results)) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    loaded = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    # Every worker loaded the rebuilt snapshot (categorical columns), none fell back to the CSV
+    assert loaded == [(1000, "category")] * len(workers)
+    assert sorted(os.listdir(tmp_path)) == ["salary_data.csv", "salary_data.snapshot", "salary_data.snapshot.lock"]
+
+
+def test_failed_close_removes_temporary_directory(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "salary_data.csv")
+    write_csv(csv_path, [40000, 45000], mtime=time.time())
+
+    def failing_rename(source, target):
+        raise OSError(39, "Directory not empty")
+
+    monkeypatch.setattr(dataset.os, "rename", failing_rename)
+    with pytest.raises(OSError):
+        build_snapshot(csv_path, str(tmp_path / "salary_data.snapshot"))
+    assert os.listdir(tmp_path) == ["salary_data.csv"]
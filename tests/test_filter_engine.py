@@ -0,0 +1,84 @@
+"""Parity of FilterEngine.select with the pandas isin-chain filtering it replaced."""
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_engine import FilterEngine  # noqa: E402
+
+JOBS = ["Sjukhusfysiker", "Sjukhusfysiker, förste", "Chef", "Annan befattning"]
+DEPTS = ["Universitetssjukhus", "Övriga sjukhus", "Universitet", None]  # None: a missing department
+SPECIALISTS = ["Specialist", "ST-fysiker", "Nej"]
+UNKNOWN = ["Not in the data", ""]
+
+
+def isin_filter(df, selected_jobs, selected_depts, selected_specialists, exp_range):
+    """The filtering get_filtered_data did before the filter engine (returns row positions)."""
+    filtered_dff = df.copy()
+    filtered_dff = filtered_dff[filtered_dff["Department"].isin(selected_depts)]
+    filtered_dff = filtered_dff[filtered_dff["Job Title"].isin(selected_jobs)]
+    filtered_dff = filtered_dff[filtered_dff["Specialist eller ST-fysiker"].isin(selected_specialists)]
+    if exp_range:
+        filtered_dff = filtered_dff[
+            (filtered_dff["ExperienceYears"] >= exp_range[0]) & (filtered_dff["ExperienceYears"] <= exp_range[1])
+        ]
+    return df.index.get_indexer(filtered_dff.index)
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        "Job Title": rng.choice(JOBS, n),
+        "Department": pd.Series(rng.choice(np.array(DEPTS, dtype=object), n), dtype=object),
+        "Specialist eller ST-fysiker": rng.choice(SPECIALISTS, n),
+        "ExperienceYears": rng.integers(0, 45, n),
+        "Månadslön totalt": rng.integers(30_000, 90_000, n),
+    })
+
+
+def random_selection(rng, values):
+    """A random subset of the known values, sometimes with unknown values mixed in."""
+    known = [value for value in values if value is not None]
+    selected = rng.sample(known, rng.randint(0, len(known)))
+    if rng.random() < 0.3:
+        selected.append(rng.choice(UNKNOWN))
+    return selected
+
+
+def test_select_matches_isin_chain(df):
+    assert df["Department"].isna().any()
+    engine = FilterEngine(df)
+    rng = random.Random(1)
+    for _ in range(500):
+        state = (
+            random_selection(rng, JOBS),
+            random_selection(rng, DEPTS),
+            random_selection(rng, SPECIALISTS),
+            sorted(rng.randint(0, 50) for _ in range(2)) if rng.random() < 0.9 else None,
+        )
+        np.testing.assert_array_equal(engine.select(*state), isin_filter(df, *state), err_msg=repr(state))
+
+
+def test_everything_selected_drops_missing_values(df):
+    # isin never matches NaN, so "all departments" still excludes rows without one
+    engine = FilterEngine(df)
+    rows = engine.select(JOBS, DEPTS[:-1], SPECIALISTS, None)
+    assert len(rows) == df["Department"].notna().sum()
+    np.testing.assert_array_equal(rows, isin_filter(df, JOBS, DEPTS[:-1], SPECIALISTS, None))
+
+
+def test_unknown_values_only_select_nothing(df):
+    engine = FilterEngine(df)
+    assert len(engine.select(UNKNOWN, DEPTS[:-1], SPECIALISTS, [0, 50])) == 0
+
+
+def test_select_is_read_only(df):
+    rows = FilterEngine(df).select(JOBS, DEPTS[:-1], SPECIALISTS, [0, 50])
+    assert not rows.flags.writeable
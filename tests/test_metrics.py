@@ -0,0 +1,45 @@
+"""/metrics reports the sum over all worker processes that share a metrics directory."""
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Metrics  # noqa: E402
+
+
+def _record_in_worker(metrics_dir, requests):
+    metrics = Metrics()
+    metrics.multiprocess_dir = metrics_dir
+    for _ in range(requests):
+        metrics.observe("dashboard_phase_seconds", "figure", 0.003)
+        metrics.increment("dashboard_requests_total", "Requests.")
+    metrics.set_gauge("dashboard_queue", "Queued renders.", 7)
+    metrics.flush(force=True)
+
+
+def test_render_sums_counters_and_histograms_over_workers(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_record_in_worker, args=(str(tmp_path), requests)) for requests in (1, 2, 3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    metrics = Metrics()
+    metrics.multiprocess_dir = str(tmp_path)
+    metrics.increment("dashboard_requests_total", "Requests.")
+    metrics.set_gauge("dashboard_queue", "Queued renders.", 2)
+    lines = metrics.render().splitlines()
+
+    assert "dashboard_requests_total 7" in lines
+    assert 'dashboard_phase_seconds_count{phase="figure"} 6' in lines
+    assert 'dashboard_phase_seconds_bucket{phase="figure",le="0.005"} 6' in lines
+    # Gauges are per worker, and only for workers that are still running
+    assert [line for line in lines if line.startswith("dashboard_queue{")] == [f'dashboard_queue{{worker="{os.getpid()}"}} 2']
+
+
+def test_render_without_multiprocess_dir_is_unlabelled():
+    metrics = Metrics()
+    metrics.set_gauge("dashboard_queue", "Queued renders.", 2)
+    assert "dashboard_queue 2" in metrics.render().splitlines()
@@ -0,0 +1,144 @@
+"""build_scatter_figure against the row_id scatterplot it replaced."""
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from dataset import DashboardData, prepare_frame  # noqa: E402
+from figures import build_scatter_figure, category_color  # noqa: E402
+from layout import COLOR_BY_OPTIONS  # noqa: E402
+from synthetic_data import generate_salary_data  # noqa: E402
+
+ID_COLUMNS = ["Job Title", "Department", "ExperienceYears", "Månadslön totalt"]
+
+
+def row_ids(df):
+    # The old code raised a ValueError here for an empty selection; treat it as no ids
+    if df.empty:
+        return pd.Series([], dtype=object)
+    return df[ID_COLUMNS].astype(str).agg("_".join, axis=1)
+
+
+def reference_traces(df, rows, color_by):
+    """
+    Traces of the old update_graph scatterplot, which matched filtered rows by a string row_id.
+
+    Returns:
+        dict: "faded" and "highlighted" (name, x, y, showlegend, color) per category, "trends"
+        {category: (trend_x, trend_y)} and the "overall" trend or None.
+    """
+    dff = df.copy()
+    filtered_dff = df.iloc[rows].copy()
+    dff["row_id"] = row_ids(dff)
+    dff["is_filtered"] = dff["row_id"].isin(set(row_ids(filtered_dff)))
+    visible_categories = filtered_dff[color_by].unique()
+
+    def polyfit_line(group):
+        if len(group) < 2:
+            return None
+        x, y = group["ExperienceYears"].to_numpy(float), group["Månadslön totalt"].to_numpy(float)
+        slope, intercept = np.polyfit(x, y, 1)
+        trend_x = np.array([x.min(), x.max()])
+        return trend_x, slope * trend_x + intercept
+
+    faded, highlighted, trends = [], [], {}
+    for idx, category in enumerate(dff[color_by].unique()):
+        category_df = dff[dff[color_by] == category]
+        visible = category in visible_categories
+        for traces, points, showlegend, shade in (
+            (highlighted, category_df[category_df["is_filtered"]], visible, "opaque"),
+            (faded, category_df[~category_df["is_filtered"]], not visible, "faded"),
+        ):
+            traces.append({
+                "name": category,
+                "x": points["ExperienceYears"].to_numpy(),
+                "y": points["Månadslön totalt"].to_numpy(),
+                "showlegend": showlegend,
+                "color": category_color(idx)[shade],
+            })
+        line = polyfit_line(filtered_dff[filtered_dff[color_by] == category])
+        if line is not None:
+            trends[category] = line
+    return {"faded": faded, "highlighted": highlighted, "trends": trends, "overall": polyfit_line(filtered_dff)}
+
+
+@pytest.fixture(scope="module")
+def data():
+    return DashboardData(prepare_frame(generate_salary_data(600, seed=3)))
+
+
+def random_state(rng, labels):
+    def pick(column):
+        return rng.sample(labels[column], rng.randint(1, len(labels[column])))
+
+    low = rng.randint(0, 40)
+    return pick("Job Title"), pick("Department"), pick("Specialist eller ST-fysiker"), (low, rng.randint(low, 50))
+
+
+@pytest.mark.filterwarnings("ignore::numpy.exceptions.RankWarning")  # polyfit on a group with one experience value
+def test_scatter_matches_row_id_reference(data):
+    rng = random.Random(5)
+    for _ in range(40):
+        state = random_state(rng, data.cube.labels)
+        color_by = rng.choice(COLOR_BY_OPTIONS)
+        rows = data.engine.select(*state)
+        fig = build_scatter_figure(data.engine, rows, color_by, data.trend_model.trendlines(state, color_by))
+        reference = reference_traces(data.df, rows, color_by)
+        k = len(reference["highlighted"])
+        assert len(fig.data) == 3 * k + 1
+
+        for idx in range(k):
+            expected = reference["highlighted"][idx]
+            trace = fig.data[k + idx]
+            assert (trace.name, trace.showlegend, trace.marker.color) == (expected["name"], expected["showlegend"], expected["color"])
+            np.testing.assert_array_equal(trace.x, expected["x"])
+            np.testing.assert_array_equal(trace.y, expected["y"])
+
+            # Faded traces hold every point of the category since the figure is patched in place
+            expected_faded = reference["faded"][idx]
+            trace = fig.data[idx]
+            assert (trace.name, trace.showlegend, trace.marker.color) == (expected_faded["name"], expected_faded["showlegend"], expected_faded["color"])
+            category_rows = data.df[color_by].to_numpy() == expected["name"]
+            np.testing.assert_array_equal(trace.x, data.df["ExperienceYears"].to_numpy()[category_rows])
+            np.testing.assert_array_equal(trace.y, data.df["Månadslön totalt"].to_numpy()[category_rows])
+
+            trend = fig.data[2 * k + 1 + idx]
+            assert trend.line.color == category_color(idx)["darker"]
+            if expected["name"] in reference["trends"]:
+                np.testing.assert_allclose(trend.x, reference["trends"][expected["name"]][0])
+                np.testing.assert_allclose(trend.y, reference["trends"][expected["name"]][1], rtol=1e-9)
+            else:
+                assert len(trend.x) == 0
+
+        overall = fig.data[2 * k]
+        assert overall.name == "Trend line" and overall.line.color == "black"
+        assert overall.showlegend == (reference["overall"] is not None)
+        if reference["overall"] is not None:
+            np.testing.assert_allclose(overall.x, reference["overall"][0])
+            np.testing.assert_allclose(overall.y, reference["overall"][1], rtol=1e-9)
+
+
+def test_duplicate_rows_are_highlighted_by_position():
+    # Two rows with the same job/department/experience/salary that differ in specialist level:
+    # the old row_id highlighted both when only one matched, the row positions highlight one
+    df = prepare_frame(pd.DataFrame({
+        "Befattning": ["Sjukhusfysiker", "Sjukhusfysiker", "Chef"],
+        "Arbetsplats": ["Universitetssjukhus", "Universitetssjukhus", "Universitet"],
+        "Antal hela år med arbete i klinisk verksamhet": [5, 5, 20],
+        "Specialist eller ST-fysiker": ["Specialist", "Nej", "Specialist"],
+        "Månadslön totalt": [50_000, 50_000, 70_000],
+    }))
+    data = DashboardData(df)
+    state = (["Sjukhusfysiker", "Chef"], ["Universitetssjukhus", "Universitet"], ["Specialist"], (0, 50))
+    rows = data.engine.select(*state)
+    fig = build_scatter_figure(data.engine, rows, "Job Title", data.trend_model.trendlines(state, "Job Title"))
+
+    assert list(fig.data[2].x) == [5] and list(fig.data[3].x) == [20]
+    assert len(reference_traces(df, rows, "Job Title")["highlighted"][0]["x"]) == 2